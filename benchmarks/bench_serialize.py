@@ -0,0 +1,75 @@
+"""Time taken by `DocumentCIMRDF.pack()` on a generated network.
+
+Usage: python benchmarks/bench_serialize.py [--baseline REVISION] [rdfs-file] [number-of-terminals]
+
+With --baseline, the module generated by the generator of a git revision is timed as well.
+"""
+import argparse
+import gc
+import importlib.util
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+
+def load_module(generator_file, rdfs_file, directory, name):
+    filename = os.path.join(directory, name + '.py')
+    subprocess.run([sys.executable, generator_file, rdfs_file, filename], check=True, stdout=subprocess.DEVNULL)
+    spec = importlib.util.spec_from_file_location(name, filename)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def network(module, n):
+    """Document with `n` terminals, each linking a switch to a connectivity node."""
+    resources = []
+    for i in range(n):
+        switch = module.Switch(mRID=f'SW{i}', name=f'Switch {i}', normalOpen=False, open=False)
+        node = module.ConnectivityNode(mRID=f'CN{i}', name=f'Node {i}')
+        resources += [switch, node, module.Terminal(sequenceNumber=1, ConductingEquipment=switch, ConnectivityNode=node)]
+    return module.DocumentCIMRDF(resources)
+
+
+def time_pack(module, n, repeat=3):
+    """Best time of `pack()` over `repeat` freshly built documents (so every resource is validated)."""
+    best = float('inf')
+    for _ in range(repeat):
+        document = network(module, n)
+        gc.collect()
+        start = time.perf_counter()
+        document.pack()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('rdfs_file', nargs='?', default=os.path.join(ROOT, 'tests', 'test_rdfs.xml'))
+    parser.add_argument('n', nargs='?', type=int, default=100000)
+    parser.add_argument('--baseline', help='git revision whose generator is timed as well')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        generators = {'current': os.path.join(ROOT, 'cimrdfpy', 'generator.py')}
+        if args.baseline:
+            source = subprocess.run(['git', 'show', f'{args.baseline}:cimrdfpy/generator.py'], cwd=ROOT, check=True, capture_output=True).stdout
+            generators[args.baseline] = os.path.join(directory, 'baseline_generator.py')
+            with open(generators[args.baseline], 'wb') as file:
+                file.write(source)
+        results = {}
+        for i, (label, generator_file) in enumerate(generators.items()):
+            results[label] = time_pack(load_module(generator_file, args.rdfs_file, directory, f'cim_{i}'), args.n)
+
+    for label, seconds in results.items():
+        print(f'{label:>10}: {seconds:8.3f} s  ({seconds / (3 * args.n) * 1e6:6.2f} us/object)')
+    if args.baseline:
+        print(f'{"speedup":>10}: {results[args.baseline] / results["current"]:8.2f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,49 @@
+"""Memory used by generated instances with and without `__slots__`.
+
+Usage: python benchmarks/bench_slots.py [rdfs-file] [number-of-terminals]
+"""
+import importlib.util
+import os
+import sys
+import tempfile
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from cimrdfpy import generator
+
+
+def load_module(rdfs_file, directory, slots):
+    name = 'cim_slots' if slots else 'cim_dict'
+    filename = os.path.join(directory, name + '.py')
+    generator.generate(rdfs_file, filename, slots=slots)
+    spec = importlib.util.spec_from_file_location(name, filename)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def network_memory(module, n):
+    """Traced bytes of a network with `n` terminals, connectivity nodes and switches."""
+    tracemalloc.start()
+    resources = []
+    for i in range(n):
+        switch = module.Switch(mRID=f'SW{i}', normalOpen=False, open=False)
+        node = module.ConnectivityNode(mRID=f'CN{i}')
+        resources.append(module.Terminal(sequenceNumber=1, ConductingEquipment=switch, ConnectivityNode=node))
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return size
+
+
+def main():
+    rdfs_file = sys.argv[1] if len(sys.argv) > 1 else os.path.join(os.path.dirname(__file__), '..', 'tests', 'test_rdfs.xml')
+    n = int(sys.argv[2]) if len(sys.argv) > 2 else 100000
+    with tempfile.TemporaryDirectory() as directory:
+        results = {slots: network_memory(load_module(rdfs_file, directory, slots), n) for slots in (False, True)}
+    for slots, size in results.items():
+        print(f"{'__slots__' if slots else '__dict__':>10}: {size / 2**20:8.1f} MiB  ({size / (3 * n):6.0f} bytes/object)")
+    print(f'{"saving":>10}: {1 - results[True] / results[False]:8.1%}')
+
+
+if __name__ == '__main__':
+    main()
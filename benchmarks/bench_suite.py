@@ -0,0 +1,166 @@
+"""Time and memory of the main operations of a generated module on synthetic networks of several sizes.
+
+Usage: python benchmarks/bench_suite.py [--sizes FEEDERSxSECTIONS ...] [--rdfs RDFS-FILE] [--compare REVISION]
+
+Each network has FEEDERS feeders of SECTIONS sections, a section being a switch, a line and a load
+with their terminals, connectivity nodes and values. Results are saved in benchmarks/results/<revision>.json
+(the git revision of the working tree, with a '-dirty' suffix if it has uncommitted changes), so they
+can be compared with the results saved for another revision with --compare.
+"""
+import argparse
+import gc
+import importlib.util
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from decimal import Decimal
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+RESULTS = os.path.join(ROOT, 'benchmarks', 'results')
+
+sys.path.insert(0, ROOT)
+from cimrdfpy import generator
+
+
+def synthetic_network(module, feeders, sections):
+    """Substation feeding `feeders` radial feeders of `sections` switch/line/load sections each.
+    Every resource can be reached from the returned substation."""
+    substation = module.Substation(mRID='SUB', name='Substation')
+    for f in range(feeders):
+        feeder = module.Feeder(mRID=f'F{f}', name=f'Feeder {f}', FeedingSubstation=substation)
+        node = module.ConnectivityNode(mRID=f'F{f}CN0', name=f'Feeder {f} head')
+        for s in range(sections):
+            switch = module.Switch(mRID=f'F{f}SW{s}', normalOpen=False, open=s == sections - 1, EquipmentContainer=substation)
+            middle = module.ConnectivityNode(mRID=f'F{f}CN{s}a')
+            line = module.ACLineSegment(mRID=f'F{f}L{s}', EquipmentContainer=substation,
+                                        length=module.Length(value=Decimal('0.25'), unit=module.UnitSymbol.m, multiplier=module.UnitMultiplier.k))
+            end = module.ConnectivityNode(mRID=f'F{f}CN{s + 1}')
+            load = module.EnergyConsumer(mRID=f'F{f}LD{s}', EquipmentContainer=substation,
+                                         p=module.ActivePower(value=Decimal('12.5'), unit=module.UnitSymbol.W, multiplier=module.UnitMultiplier.k),
+                                         q=module.ReactivePower(value=Decimal('3.1'), unit=module.UnitSymbol.VAr, multiplier=module.UnitMultiplier.k))
+            for sequence, (equipment, equipment_node) in enumerate(((switch, node), (switch, middle), (line, middle), (line, end), (load, end))):
+                module.Terminal(sequenceNumber=sequence % 2 + 1, ConductingEquipment=equipment, ConnectivityNode=equipment_node)
+            node = end
+    return substation
+
+
+def load_module(rdfs_file, directory):
+    filename = os.path.join(directory, 'cim_suite.py')
+    generator.generate(rdfs_file, filename)
+    spec = importlib.util.spec_from_file_location('cim_suite', filename)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules['cim_suite'] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def measure(function, memory = True, setup = None):
+    """Seconds taken by `function()` and, with `memory`, the peak of memory allocated by a second call.
+    `setup()` is called, untimed, before each call."""
+    if setup is not None:
+        setup()
+    gc.collect()
+    start = time.perf_counter()
+    function()
+    seconds = time.perf_counter() - start
+    peak = None
+    if memory:
+        if setup is not None:
+            setup()
+        gc.collect()
+        tracemalloc.start()
+        function()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return {'seconds': seconds, 'peak_bytes': peak}
+
+
+def run(rdfs_file, feeders, sections, memory = True):
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        results['generate'] = measure(lambda: generator.generate(rdfs_file, os.path.join(directory, 'generated.py')), memory)
+        module = load_module(rdfs_file, directory)
+        DocumentCIMRDF = module.DocumentCIMRDF
+
+        network = synthetic_network(module, feeders, sections)
+        results['network'] = measure(lambda: synthetic_network(module, feeders, sections), memory)
+        document = DocumentCIMRDF(backend='stdlib')
+        results['add_recursively'] = measure(lambda: DocumentCIMRDF(backend='stdlib').add_recursively(network), memory)
+        document.add_recursively(network)
+        results['resources'] = len(document.resources)
+
+        def fresh():
+            # Resources are validated once until changed, so validating exports start from unvalidated copies
+            for resource in document.resources:
+                resource._validated = False
+        results['validate_all'] = measure(document.validate_all, memory)
+        assert document.validate_all() == [], 'the synthetic network should be valid'
+        results['pack'] = measure(document.pack, memory, fresh)
+        results['tostring'] = measure(document.tostring, memory, fresh)
+        filename = os.path.join(directory, 'network.xml')
+        results['tofile'] = measure(lambda: document.tofile(filename), memory, fresh)
+        results['file_bytes'] = os.path.getsize(filename)
+
+        xml = document.tostring()
+        results['fromstring'] = measure(lambda: DocumentCIMRDF(backend='stdlib').fromstring(xml), memory)
+        results['fromfile'] = measure(lambda: DocumentCIMRDF(backend='stdlib').fromfile(filename), memory)
+        del sys.modules['cim_suite']
+    return results
+
+
+def revision():
+    def git(*args):
+        return subprocess.run(['git', *args], cwd=ROOT, capture_output=True, text=True).stdout.strip()
+    commit = git('rev-parse', '--short', 'HEAD') or 'unknown'
+    return commit + '-dirty' if git('status', '--porcelain', '--untracked-files=no') else commit
+
+
+def report(results, baseline = None):
+    for size, steps in results.items():
+        print(f"{size} ({steps['resources']} resources, {steps['file_bytes'] / 2**20:.1f} MiB of XML)")
+        for step, measures in steps.items():
+            if not isinstance(measures, dict):
+                continue
+            line = f"  {step:>16}: {measures['seconds']:8.3f} s"
+            if measures['peak_bytes'] is not None:
+                line += f"  {measures['peak_bytes'] / 2**20:8.1f} MiB"
+            previous = (baseline or {}).get(size, {}).get(step)
+            if previous:
+                line += f"  ({previous['seconds'] / measures['seconds']:5.2f}x vs baseline)"
+            print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', nargs='+', default=['10x100', '20x500', '50x1000'], help='network sizes, as FEEDERSxSECTIONS')
+    parser.add_argument('--rdfs', default=os.path.join(ROOT, 'tests', 'test_rdfs.xml'), help='RDFS profile of the generated module')
+    parser.add_argument('--compare', metavar='REVISION', help='revision whose saved results are compared with these')
+    parser.add_argument('--no-memory', action='store_true', help='only measure time (memory is traced in a second, slower run)')
+    args = parser.parse_args()
+
+    results = {}
+    for size in args.sizes:
+        feeders, sections = map(int, size.split('x'))
+        results[size] = run(args.rdfs, feeders, sections, not args.no_memory)
+
+    baseline = None
+    if args.compare:
+        with open(os.path.join(RESULTS, args.compare + '.json')) as file:
+            baseline = json.load(file)['results']
+    report(results, baseline)
+
+    os.makedirs(RESULTS, exist_ok=True)
+    name = revision()
+    with open(os.path.join(RESULTS, name + '.json'), 'w') as file:
+        json.dump({'revision': name, 'python': platform.python_version(), 'machine': platform.machine(),
+                   'time': time.strftime('%Y-%m-%dT%H:%M:%S'), 'results': results}, file, indent=2)
+    print(f'Saved as {os.path.relpath(os.path.join(RESULTS, name + ".json"))}')
+
+
+if __name__ == '__main__':
+    main()
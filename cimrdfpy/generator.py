@@ -1,585 +1,2284 @@
-from decimal import Decimal
-from functools import cmp_to_key
-from xml.etree import ElementTree
-from itertools import chain
-
-__RDF_NS = "http://www.w3.org/1999/02/22-rdf-syntax-ns#"
-__RDFS_NS = "http://www.w3.org/2000/01/rdf-schema#"
-__CIMS_NS = "http://iec.ch/TC57/1999/rdf-schema-extensions-19990926#"
-__UML_NS = "http://langdale.com.au/2005/UML#"
-__XSD_NS = "http://www.w3.org/2001/XMLSchema#"
-__XML_NS = "http://www.w3.org/XML/1998/namespace"
-
-__XML_BASE = '{'+__XML_NS+'}base'
-__DESCRIPTION_TAG = '{'+__RDF_NS+'}Description'
-__TYPE_TAG = '{'+__RDF_NS+'}type'
-__LABEL_TAG = '{'+__RDFS_NS+'}label'
-__COMMENT_TAG = '{'+__RDFS_NS+'}comment'
-__RESOURCE_ATTRIB = '{'+__RDF_NS+'}resource'
-__ABOUT_ATTRIB = '{'+__RDF_NS+'}about'
-__ID_ATTRIB = '{'+__RDF_NS+'}ID'
-__STEREOTYPE_TAG = '{'+__CIMS_NS+'}stereotype'
-# Class
-__CLASS_TAG = '{'+__RDFS_NS+'}Class'
-__CLASS_URI = __RDFS_NS+'Class'
-__SUBCLASSOF_TAG = '{'+__RDFS_NS+'}subClassOf'
-# Property
-__PROPERTY_TAG = '{'+__RDF_NS+'}Property'
-__PROPERTY_URI = __RDF_NS+'Property'
-__DOMAIN_TAG = '{'+__RDFS_NS+'}domain'
-__RANGE_TAG = '{'+__RDFS_NS+'}range'
-__MULTIPLICITY_TAG = '{' + __CIMS_NS + '}multiplicity'
-__INVERSEROLE_TAG = '{' + __CIMS_NS + '}inverseRoleName'
-__DATATYPE_TAG = '{'+__CIMS_NS+'}dataType'
-# Enumeration
-__ENUMERATION_URI = __UML_NS+'enumeration'
-# cim data type
-__CIMDATATYPE_URI = __UML_NS+'cimdatatype'
-
-def is_class(element):
-    return element.tag == __CLASS_TAG or \
-        element.tag == __DESCRIPTION_TAG and \
-        element.find(__TYPE_TAG).attrib[__RESOURCE_ATTRIB] == __CLASS_URI
-
-def is_property(element):
-    return element.tag == __PROPERTY_TAG or \
-        element.tag == __DESCRIPTION_TAG and \
-        element.find(__TYPE_TAG).attrib[__RESOURCE_ATTRIB] == __PROPERTY_URI
-
-def is_enumeration(element):
-    return is_class(element) and \
-        element.find(__STEREOTYPE_TAG) != None and \
-        element.find(__STEREOTYPE_TAG).attrib[__RESOURCE_ATTRIB] == __ENUMERATION_URI
-
-def is_cimdatatype(element):
-    return is_class(element) and \
-        element.find(__STEREOTYPE_TAG) != None and \
-        element.find(__STEREOTYPE_TAG).attrib[__RESOURCE_ATTRIB] == __CIMDATATYPE_URI
-
-
-#################################
-import sys
-
-def main():
-    input_file, output_file = sys.argv[1:3]
-
-    xmldoc = ElementTree.parse(input_file)
-    root = xmldoc.getroot()
-    __BASE_NS = root.attrib[__XML_BASE].replace('#', '') + '#'
-
-    datatype = {
-        'float': 'Decimal',
-        'string': 'str',
-        'integer': 'int',
-        'boolean': 'bool'
-    }
-
-    def get_type(element):
-        if element.tag == __DESCRIPTION_TAG:
-            return element.find(__TYPE_TAG).attrib[__RESOURCE_ATTRIB].split('#')[1]
-        return element.tag.split('}')[1]
-
-    def get_resource_label(element):
-        return element.find(__LABEL_TAG).text
-        
-    def get_resource_id(element):
-        if __ID_ATTRIB in element.attrib:
-            return element.attrib[__ID_ATTRIB]
-        if __ABOUT_ATTRIB in element.attrib:
-            return element.attrib[__ABOUT_ATTRIB].split('#')[1]
-
-    def get_resources_by_type(type):
-        return filter(lambda resource: get_type(resource) == type, root)
-        
-    def get_properties_by_domain(domain):
-        filt = filter(lambda resource: is_property(resource), root)
-        filt = filter(lambda resource: resource.find(__DOMAIN_TAG) != None, filt)
-        filt = filter(lambda resource: resource.find(__DOMAIN_TAG).attrib[__RESOURCE_ATTRIB].split('#')[1] == domain, filt)
-        return filt
-
-    def get_property_multiplicity(prop):
-        multiplicity_tag = prop.find(__MULTIPLICITY_TAG)
-        if multiplicity_tag != None:
-            return multiplicity_tag.attrib[__RESOURCE_ATTRIB].split('#M:')[1]
-        return '1..1'
-
-    def get_superclass(element):
-        superclass_tag = element.find(__SUBCLASSOF_TAG)
-        if superclass_tag != None:
-            return superclass_tag.attrib[__RESOURCE_ATTRIB].split('#')[1]
-        return ''
-
-    def get_comments(element):
-        comment_tag = element.find(__COMMENT_TAG)
-        if comment_tag != None:
-            return comment_tag.text
-        return ''
-        
-    def get_property_inverse_role_name(prop):
-        return prop.find(__INVERSEROLE_TAG).attrib[__RESOURCE_ATTRIB].split('#')[1] if prop.find(__INVERSEROLE_TAG) != None else None
-
-    enumerations = {}
-    classes = {}
-
-    for entry in root:
-        if is_enumeration(entry):
-            label = get_resource_label(entry)
-            enumerations[label] = {}
-            # capture resources that are of this type
-            resources = get_resources_by_type(label)
-            enumeration_set = map(lambda resource: (get_resource_label(resource), get_comments(resource)), resources)
-            enumerations[label]['set'] = {value: {'comments': comments.replace('\n', ' ').replace('\r', '')} for (value, comments) in enumeration_set}
-            enumerations[label]['comments'] = get_comments(entry)
-        elif is_class(entry):
-            label = get_resource_label(entry)
-            classes[label] = {}
-            classes[label]['super'] = get_superclass(entry) 
-            classes[label]['comments'] = get_comments(entry)
-            classes[label]['properties'] = {}
-            properties = get_properties_by_domain(label)
-            for prop in properties:
-                prop_id = get_resource_id(prop)
-                classes[label]['properties'][prop_id] = {}
-                prop_obj = classes[label]['properties'][prop_id]
-                prop_obj['comments'] = get_comments(prop)
-                prop_obj['multiplicity'] = get_property_multiplicity(prop)
-                prop_obj['inverseRoleName'] = get_property_inverse_role_name(prop)
-                if prop.find(__RANGE_TAG) != None:
-                    prop_obj['type'] = prop.find(__RANGE_TAG).attrib[__RESOURCE_ATTRIB].split('#')[1]
-                elif prop.find(__DATATYPE_TAG) != None:
-                    prop_obj['type'] = prop.find(__DATATYPE_TAG).attrib[__RESOURCE_ATTRIB].split('#')[1]
-    
-    # Define all super properties (all class' and its parents' properties)
-    for class_name, class_detail in classes.items():
-        classes[class_name]['superproperties'] = {}
-        current_node = class_name
-        while current_node != '':
-            classes[class_name]['superproperties'].update(classes[current_node]['properties'])
-            current_node = classes[current_node]['super']
-    
-    def class_iterator(classes):
-        def tree_sort(classes):
-            names = []
-            while len(names) != len(classes):
-                for _class in classes:
-                    if _class not in names and (classes[_class]['super'] == '' or classes[_class]['super'] in names):
-                        names.append(_class)
-            return names
-        sorted_classes = tree_sort(classes)
-        return [(class_name, classes[class_name]) for class_name in sorted_classes]
-
-    def property_iterator(properties):
-        for prop_name in properties:
-            new_property = properties[prop_name]
-            dtype = new_property['type'] if new_property['type'] not in datatype else datatype[new_property['type']]
-            comments = new_property['comments']
-            inverseRoleName = new_property['inverseRoleName']
-            if '..' in new_property['multiplicity']:
-                minBound, maxBound = new_property['multiplicity'].split('..')
-                minBound = int(minBound)
-                maxBound = float('Inf') if maxBound == 'n' else int(maxBound)
-            elif new_property['multiplicity'] == 'n':
-                minBound, maxBound = 0, float('Inf')
-            else:
-                minBound, maxBound = 2 * [int(new_property['multiplicity'])]
-            yield (prop_name.split(".")[1], dtype, inverseRoleName and inverseRoleName.split(".")[1], minBound, maxBound, comments.replace("\n", " "))
-
-    TEXT = '''from decimal import Decimal
-from enum import Enum
-from typing import List, Union
-from uuid import uuid4 as uuid
-from xml.etree import ElementTree as ET
-from xml.dom.minidom import parseString
-
-__RDF_NS = "http://www.w3.org/1999/02/22-rdf-syntax-ns#"
-__RDFS_NS = "http://www.w3.org/2000/01/rdf-schema#"
-__CIMS_NS = "http://iec.ch/TC57/1999/rdf-schema-extensions-19990926#"
-__UML_NS = "http://langdale.com.au/2005/UML#"
-__XSD_NS = "http://www.w3.org/2001/XMLSchema#"
-__XML_NS = "http://www.w3.org/XML/1998/namespace"
-
-__XML_BASE = '{'+__XML_NS+'}base'
-__DESCRIPTION_TAG = '{'+__RDF_NS+'}Description'
-__TYPE_TAG = '{'+__RDF_NS+'}type'
-__LABEL_TAG = '{'+__RDFS_NS+'}label'
-__COMMENT_TAG = '{'+__RDFS_NS+'}comment'
-__RESOURCE_ATTRIB = '{'+__RDF_NS+'}resource'
-__ABOUT_ATTRIB = '{'+__RDF_NS+'}about'
-__ID_ATTRIB = '{'+__RDF_NS+'}ID'
-__STEREOTYPE_TAG = '{'+__CIMS_NS+'}stereotype'
-# Class
-__CLASS_TAG = '{'+__RDFS_NS+'}Class'
-__CLASS_URI = __RDFS_NS+'Class'
-__SUBCLASSOF_TAG = '{'+__RDFS_NS+'}subClassOf'
-# Property
-__PROPERTY_TAG = '{'+__RDF_NS+'}Property'
-__PROPERTY_URI = __RDF_NS+'Property'
-__DOMAIN_TAG = '{'+__RDFS_NS+'}domain'
-__RANGE_TAG = '{'+__RDFS_NS+'}range'
-__MULTIPLICITY_TAG = '{' + __CIMS_NS + '}multiplicity'
-__INVERSEROLE_TAG = '{' + __CIMS_NS + '}inverseRoleName'
-__DATATYPE_TAG = '{'+__CIMS_NS+'}dataType'
-# Enumeration
-__ENUMERATION_URI = __UML_NS+'enumeration'
-# cim data type
-__CIMDATATYPE_URI = __UML_NS+'cimdatatype'
-'''
-    TEXT += f"__BASE_NS = '{__BASE_NS}'"
-    TEXT += '''
-
-def _import(root):
-    def get_type(element):
-        if element.tag == __DESCRIPTION_TAG:
-            return element.find(__TYPE_TAG).attrib[__RESOURCE_ATTRIB].split('#')[1]
-        return element.tag.split('}')[1]
-    def get_element_URI(element):
-        try:
-            return __BASE_NS.replace('#','') + '#' + element.attrib[__ID_ATTRIB]
-        except:
-            return __BASE_NS.replace('#','') + element.attrib[__ABOUT_ATTRIB]
-
-    instances_dict = {}
-
-    try:
-        __BASE_NS = root.attrib[__XML_BASE].replace('#', '') + '#'
-    except:
-        __BASE_NS = ''
-
-    # Instance resouces and set URI
-    for child in root:
-        resource_type = get_type(child)
-        uri = '#' + get_element_URI(child).split('#')[1]
-        instances_dict[uri] = eval(f'{resource_type}()')
-        instances_dict[uri].URI = uri
-
-    # Set resources attributes
-    for child in root:
-        uri = '#' + get_element_URI(child).split('#')[1]
-        instance = instances_dict[uri]
-        for resource_item in child:
-            dtype = get_type(resource_item).split('.')[1]
-            instance_attribute = getattr(instance, dtype)
-            if __RESOURCE_ATTRIB in resource_item.attrib:
-                referenced_resource_uri = resource_item.attrib[__RESOURCE_ATTRIB]
-                value = instances_dict[referenced_resource_uri]
-            else:
-                value = resource_item.text
-            if isinstance(instance_attribute, list):
-                add_method = getattr(instance, f'add_{dtype}')
-                add_method(value)
-            else:
-                setattr(instance, dtype, value)
-
-    return instances_dict
-'''      
-    TEXT += f'''
-class DocumentCIMRDF():
-    PRIMITIVES = ({', '.join(primitive for primitive in datatype.values())})
-
-    def __init__(self, resources = []):
-        self.resources = []
-        for resource in resources:
-            self.resources.append(resource)
-
-    def add_elements(self, elements: Union[ET.Element, List[ET.Element]]):
-        elements = elements if isinstance(elements, list) else [elements]
-        for element in elements:
-            if element not in self.resources:
-                self.resources.append(element)
-
-    def add_recursively(self, elements: Union[ET.Element, List[ET.Element]]):
-        elements = elements if isinstance(elements, list) else [elements]
-        for element in elements:
-            if element not in self.resources and element != None and all(not isinstance(element, primitive) for primitive in DocumentCIMRDF.PRIMITIVES) and not isinstance(element, Enum):
-                self.resources.append(element)
-                for intern_element in element.__dict__.values():
-                    self.add_recursively(intern_element)
-
-    def dump(self):
-        rough_string = self.tostring()
-        reparsed = parseString(rough_string)
-        print(reparsed.toprettyxml(indent=' '*4))
-    
-    def pack(self):
-        root = ET.Element('{'{'+__RDF_NS+'}'}RDF', attrib={"{'"+__XML_BASE+"': '"+__BASE_NS.replace('#','')+"/new_resource#'}"})
-        for element in self.resources:
-            root.append(element.serialize())
-        return ET.ElementTree(root)
-
-    def tostring(self):
-        root = self.pack().getroot()
-        return ET.tostring(root)
-
-    def fromstring(self, xml):
-        root = ET.fromstring(xml)
-        self.resources = list(_import(root).values())
-
-    def tofile(self, filename):
-        etree = self.pack()
-        etree.write(filename)
-
-    def fromfile(self, filename):
-        root = ET.parse(filename).getroot()
-        self.resources = list(_import(root).values())
-
-'''
-
-    for enum in enumerations:
-        TEXT += f'''
-class {enum}(str, Enum):
-    """{enumerations[enum]['comments']}"""'''
-        for enum_value in enumerations[enum]['set']:
-            TEXT += f'''
-    {enum_value} = '{enum_value}' # {enumerations[enum]['set'][enum_value]['comments']} '''
-        TEXT += '\n'
-
-    class_iter = class_iterator(classes)
-
-    for class_name, class_detail in class_iter:
-        property_iter = list(property_iterator(class_detail['properties']))
-        superproperty_iter = list(property_iterator(class_detail['superproperties']))
-
-        # Class __init__
-        TEXT += f''' 
-class {class_name}({class_detail['super']}):
-    """{class_detail['comments']}"""
-    def __init__(self'''
-
-        # Constructor attributes
-        for prop_name, dtype, inverseRoleName, minBound, maxBound, comments in superproperty_iter:
-            if maxBound < 2:
-                TEXT += f''', {prop_name}: {dtype if dtype in datatype.values() else f"'{dtype}'"} = None'''
-            elif maxBound >= 2:
-                TEXT += f''', {prop_name}: List[{dtype if dtype in datatype.values() else f"'{dtype}'"}] = None'''
-        TEXT += '):'
-
-        # Super class
-        if class_detail['super']:
-            TEXT += f'''
-        super().__init__('''
-
-            # Super call attributes
-            TEXT += ', '.join(f'{prop_name}={prop_name}' for prop_name, dtype, inverseRoleName, minBound, maxBound, comments in property_iterator(classes[class_detail['super']]['superproperties']))
-            TEXT += ')'
-
-        # URI generate URI
-        if not class_detail['super']:
-            TEXT += f'''
-        self.URI = '#' + str(uuid())'''
-
-        # List instance attributes
-        for prop_name, dtype, inverseRoleName, minBound, maxBound, comments in property_iter:
-
-            TEXT += f'''
-        # {comments} ''' if comments else ''
-            TEXT += f'''
-        self.{prop_name} = {prop_name}'''
-
-        # Define Properties
-        for prop_name, dtype, inverseRoleName, minBound, maxBound, comments in property_iter:
-
-            # For non list properties
-            if maxBound < 2:
-                TEXT += f'''
-    @property
-    def {prop_name}(self) -> {dtype if dtype in datatype.values() else f"'{dtype}'"}:
-        return self.__{prop_name}
-    @{prop_name}.setter
-    def {prop_name}(self, value: {dtype if dtype in datatype.values() else f"'{dtype}'"}):
-        if value == None:
-            self.__{prop_name} = None
-        elif not hasattr(self, '{prop_name}') or self.{prop_name} is not value:'''
-
-                # Boolean type
-                if dtype == 'bool':
-                    TEXT += f'''
-            self.__{prop_name} = str(value).lower() == 'true' '''
-                # Other primitives
-                elif dtype in datatype.values():
-                    TEXT += f'''
-            self.__{prop_name} = {dtype}(value)'''
-                # Enumerations
-                elif dtype in enumerations:
-                    TEXT += f'''
-            self.__{prop_name} = {dtype}(value)'''
-                # Complex values
-                else:
-                    TEXT += f'''
-            self.__{prop_name} = value'''
-                
-                # Set inverse attribute if it exists
-                if inverseRoleName:
-                    TEXT += f'''
-            if isinstance(value.{inverseRoleName}, list):
-                value.add_{inverseRoleName}(self)
-            else:
-                value.{inverseRoleName} = self'''
-
-            # For lists
-            elif maxBound >= 2:
-                TEXT += f'''
-    def add_{prop_name}(self, value: {dtype if dtype in datatype.values() else f"'{dtype}'"}):
-        if not hasattr(self, '{prop_name}'):
-            self.__{prop_name} = []
-        if value not in self.__{prop_name}:'''
-
-                # Boolean type
-                if dtype == 'bool':
-                    TEXT += f'''
-            self.__{prop_name}.append(str(value).lower() == 'true')'''
-                # Other primitives
-                elif dtype in datatype.values():
-                    TEXT += f'''
-            self.__{prop_name}.append({dtype}(value))'''
-                # Enumerations
-                elif dtype in enumerations:
-                    TEXT += f'''
-            self.__{prop_name}.append({dtype}(value))'''
-                # Complex values
-                else:
-                    TEXT += f'''
-            self.__{prop_name}.append(value)'''
-
-                # Set inverse attribute if it exists
-                if inverseRoleName:
-                    TEXT += f'''
-            if isinstance(value.{inverseRoleName}, list):
-                value.add_{inverseRoleName}(self)
-            else:
-                value.{inverseRoleName} = self'''
-                TEXT += f'''
-    @property
-    def {prop_name}(self) -> List[{dtype if dtype in datatype.values() else f"'{dtype}'"}]:
-        return self.__{prop_name}
-    @{prop_name}.setter
-    def {prop_name}(self, list_objs: List[{dtype if dtype in datatype.values() else f"'{dtype}'"}]):
-        if list_objs == None:
-            self.__{prop_name} = []
-            return
-        for obj in list_objs:
-            self.add_{prop_name}(obj)'''
-
-                # Set inverse attribute if it exists
-                if inverseRoleName:
-                    TEXT += f'''
-        if len(list_objs):
-            if isinstance(list_objs[0].{inverseRoleName}, list):
-                for obj in list_objs:
-                    obj.add_{inverseRoleName}(self)
-            else:
-                for obj in list_objs:
-                    obj.{inverseRoleName} = self'''
-
-        # SERIALIZATION #####################################################################
-
-        TEXT += f'''
-    def serialize(self) -> ET.Element:
-        self.validate()'''
-        if class_detail['super']:
-            TEXT += f'''
-        root = super().serialize()
-        root.tag = '{'{' + __BASE_NS + '}'}{class_name}' '''
-        else:
-            TEXT += f'''
-        root = ET.Element('{'{'+__BASE_NS+'}'}{class_name}', attrib={"{'{"+__RDF_NS+"}about': self.URI}"})'''
-        
-        
-        for prop_name, dtype, inverseRoleName, minBound, maxBound, comments in property_iter:
-
-            if maxBound < 2:  # If it is a unique object
-
-                TEXT += f'''
-        if self.{prop_name} != None:'''
-
-                if dtype == 'bool': # If it is a boolean value
-                    TEXT += f'''
-            prop = ET.SubElement(root, '{'{'+__BASE_NS+'}'}{f'{class_name}.{prop_name}'}')
-            prop.text = {f'str(self.{prop_name}).lower()'}'''
-
-                elif dtype in datatype.values(): # If it is another primitive
-                    TEXT += f'''
-            prop = ET.SubElement(root, '{'{'+__BASE_NS+'}'}{f'{class_name}.{prop_name}'}')
-            prop.text = {f'str(self.{prop_name})'}'''
-
-                elif dtype in enumerations: # If it is an enumeration
-                    TEXT += f'''
-            prop = ET.SubElement(root, '{'{'+__BASE_NS+'}'}{f'{class_name}.{prop_name}'}')
-            prop.text = {f'self.{prop_name}.value'}'''
-
-                else: # if it is a complex type
-                    TEXT += f'''
-            ET.SubElement(root, '{'{'+__BASE_NS+'}'}{f'{class_name}.{prop_name}'}', attrib={"{'{" +__RDF_NS+"}"}resource': self.__{prop_name+'.URI}'})'''
-            
-
-            elif maxBound >= 2:  # If it is a list of objects
-
-                TEXT += f'''
-        if self.{prop_name} != []:
-            for item in self.{prop_name}:'''
-
-                if dtype == 'bool': # If they are primitives
-                    TEXT += f'''
-                prop = ET.SubElement(root, '{'{'+__BASE_NS+'}'}{f'{class_name}.{prop_name}'}')
-                prop.text = {f'str(item).lower()'}'''
-            
-                elif dtype in datatype.values(): # If they are other primitives
-                    TEXT += f'''
-                prop = ET.SubElement(root, '{'{'+__BASE_NS+'}'}{f'{class_name}.{prop_name}'}')
-                prop.text = str(item)'''
-                
-                elif dtype in enumerations: # If they are enumerations
-                    TEXT += f'''
-                prop = ET.SubElement(root, '{'{'+__BASE_NS+'}'}{f'{class_name}.{prop_name}'}')
-                prop.text = item.value'''
-
-                else: # if it is a complex type
-                    TEXT += f'''
-                ET.SubElement(root, '{'{'+__BASE_NS+'}'}{f'{class_name}.{prop_name}'}', attrib={"{'{" +__RDF_NS+"}"}resource': item.URI{'}'})'''
-        TEXT += '''
-        return root'''
-    
-
-        # VALIDATION
-
-        TEXT += '''
-    def validate(self):'''
-        TEXT += '''
-        super().validate()''' if class_detail['super'] else ''
-        
-        for prop_name, dtype, inverseRoleName, minBound, maxBound, comments in property_iter:
-
-            if maxBound < 2:
-                #>>>>>>>>>>>>>>>>>>>>>>
-                TEXT += f'''
-        if not isinstance(self.{prop_name}, {dtype}){f' and self.{prop_name} != None' if minBound == 0 else ''}:
-            raise ValueError(f'Incorrect datatype in {prop_name} [{class_name}] (expected {dtype} but encountered {'{self.'+prop_name+'.__class__.__name__}'} instead)')'''
-                #<<<<<<<<<<<<<<<<<<<<<<
-            else:
-                #>>>>>>>>>>>>>>>>>>>>>>
-                TEXT += f'''
-        minBound, maxBound = {minBound}, {maxBound if type(maxBound) != float else "float('Inf')"}
-        if len(self.{prop_name}) < minBound or len(self.{prop_name}) > maxBound:
-            raise ValueError('Incorrect multiplicity in {prop_name} [{class_name}]')
-        if any(not isinstance(item, {dtype}) for item in self.{prop_name}):
-            raise ValueError(f'Incorrect datatype in {prop_name} [{class_name}] (expected {dtype} but encountered {'{self.'+prop_name+'.__class__.__name__}'} instead)')'''
-                #<<<<<<<<<<<<<<<<<<<<<<
-
-        # If no property, it only passes
-        if not class_detail['super'] and not len(property_iter):
-            TEXT += '''
-        pass'''
-        TEXT += '\n'
-
-    TEXT += '''
-__all__ = [
-    'DocumentCIMRDF',
-    '''
-    TEXT += ',\n    '.join(f"'{e}'" for e in sorted(chain(enumerations, classes)))
-    TEXT += '\n]'
-    TEXT += '\n'
-
-    with open(output_file, 'w') as file:
-        file.write(TEXT)
-
-if __name__ == "__main__":
-    main()
\ No newline at end of file
+import argparse
+import hashlib
+import heapq
+import json
+import os
+import shutil
+from decimal import Decimal
+from functools import cmp_to_key
+from xml.etree import ElementTree
+from itertools import chain
+
+__version__ = '2.1'
+
+__RDF_NS = "http://www.w3.org/1999/02/22-rdf-syntax-ns#"
+__RDFS_NS = "http://www.w3.org/2000/01/rdf-schema#"
+__CIMS_NS = "http://iec.ch/TC57/1999/rdf-schema-extensions-19990926#"
+__UML_NS = "http://langdale.com.au/2005/UML#"
+__XSD_NS = "http://www.w3.org/2001/XMLSchema#"
+__XML_NS = "http://www.w3.org/XML/1998/namespace"
+
+__XML_BASE = '{'+__XML_NS+'}base'
+__DESCRIPTION_TAG = '{'+__RDF_NS+'}Description'
+__TYPE_TAG = '{'+__RDF_NS+'}type'
+__LABEL_TAG = '{'+__RDFS_NS+'}label'
+__COMMENT_TAG = '{'+__RDFS_NS+'}comment'
+__RESOURCE_ATTRIB = '{'+__RDF_NS+'}resource'
+__ABOUT_ATTRIB = '{'+__RDF_NS+'}about'
+__ID_ATTRIB = '{'+__RDF_NS+'}ID'
+__STEREOTYPE_TAG = '{'+__CIMS_NS+'}stereotype'
+# Class
+__CLASS_TAG = '{'+__RDFS_NS+'}Class'
+__CLASS_URI = __RDFS_NS+'Class'
+__SUBCLASSOF_TAG = '{'+__RDFS_NS+'}subClassOf'
+# Property
+__PROPERTY_TAG = '{'+__RDF_NS+'}Property'
+__PROPERTY_URI = __RDF_NS+'Property'
+__DOMAIN_TAG = '{'+__RDFS_NS+'}domain'
+__RANGE_TAG = '{'+__RDFS_NS+'}range'
+__MULTIPLICITY_TAG = '{' + __CIMS_NS + '}multiplicity'
+__INVERSEROLE_TAG = '{' + __CIMS_NS + '}inverseRoleName'
+__DATATYPE_TAG = '{'+__CIMS_NS+'}dataType'
+# Enumeration
+__ENUMERATION_URI = __UML_NS+'enumeration'
+# cim data type
+__CIMDATATYPE_URI = __UML_NS+'cimdatatype'
+
+def is_class(element):
+    return element.tag == __CLASS_TAG or \
+        element.tag == __DESCRIPTION_TAG and \
+        element.find(__TYPE_TAG).attrib[__RESOURCE_ATTRIB] == __CLASS_URI
+
+def is_property(element):
+    return element.tag == __PROPERTY_TAG or \
+        element.tag == __DESCRIPTION_TAG and \
+        element.find(__TYPE_TAG).attrib[__RESOURCE_ATTRIB] == __PROPERTY_URI
+
+def is_enumeration(element):
+    return is_class(element) and \
+        element.find(__STEREOTYPE_TAG) != None and \
+        element.find(__STEREOTYPE_TAG).attrib[__RESOURCE_ATTRIB] == __ENUMERATION_URI
+
+def is_cimdatatype(element):
+    return is_class(element) and \
+        element.find(__STEREOTYPE_TAG) != None and \
+        element.find(__STEREOTYPE_TAG).attrib[__RESOURCE_ATTRIB] == __CIMDATATYPE_URI
+
+
+def get_type(element):
+    if element.tag == __DESCRIPTION_TAG:
+        return element.find(__TYPE_TAG).attrib[__RESOURCE_ATTRIB].split('#')[1]
+    return element.tag.split('}')[1]
+
+def get_resource_label(element):
+    return element.find(__LABEL_TAG).text
+
+def get_resource_id(element):
+    if __ID_ATTRIB in element.attrib:
+        return element.attrib[__ID_ATTRIB]
+    if __ABOUT_ATTRIB in element.attrib:
+        return element.attrib[__ABOUT_ATTRIB].split('#')[1]
+
+def get_property_domain(prop):
+    domain_tag = prop.find(__DOMAIN_TAG)
+    if domain_tag != None:
+        return domain_tag.attrib[__RESOURCE_ATTRIB].split('#')[1]
+    return None
+
+def get_property_multiplicity(prop):
+    multiplicity_tag = prop.find(__MULTIPLICITY_TAG)
+    if multiplicity_tag != None:
+        return multiplicity_tag.attrib[__RESOURCE_ATTRIB].split('#M:')[1]
+    return '1..1'
+
+def get_superclass(element):
+    superclass_tag = element.find(__SUBCLASSOF_TAG)
+    if superclass_tag != None:
+        return superclass_tag.attrib[__RESOURCE_ATTRIB].split('#')[1]
+    return ''
+
+def get_comments(element):
+    comment_tag = element.find(__COMMENT_TAG)
+    if comment_tag != None:
+        return comment_tag.text
+    return ''
+
+def get_property_inverse_role_name(prop):
+    return prop.find(__INVERSEROLE_TAG).attrib[__RESOURCE_ATTRIB].split('#')[1] if prop.find(__INVERSEROLE_TAG) != None else None
+
+
+def index_schema(root):
+    """Index the RDFS entries of `root` in a single pass.
+
+    Returns a dict with three lookup tables:
+      * 'properties_by_domain': class label -> list of its property elements
+      * 'resources_by_type': type name -> list of elements of that type (e.g. enumeration literals)
+      * 'elements_by_id': resource id -> element
+    Lists keep the document order of the entries.
+    """
+    properties_by_domain = {}
+    resources_by_type = {}
+    elements_by_id = {}
+
+    for element in root:
+        resources_by_type.setdefault(get_type(element), []).append(element)
+        resource_id = get_resource_id(element)
+        if resource_id is not None:
+            elements_by_id[resource_id] = element
+        if is_property(element):
+            domain = get_property_domain(element)
+            if domain is not None:
+                properties_by_domain.setdefault(domain, []).append(element)
+
+    return {
+        'properties_by_domain': properties_by_domain,
+        'resources_by_type': resources_by_type,
+        'elements_by_id': elements_by_id
+    }
+
+
+def parse_schema(root):
+    """Extract the enumerations and classes described by the RDFS `root` element."""
+    index = index_schema(root)
+    properties_by_domain = index['properties_by_domain']
+    resources_by_type = index['resources_by_type']
+
+    enumerations = {}
+    classes = {}
+
+    for entry in root:
+        if is_enumeration(entry):
+            label = get_resource_label(entry)
+            enumerations[label] = {}
+            # capture resources that are of this type
+            resources = resources_by_type.get(label, [])
+            enumeration_set = map(lambda resource: (get_resource_label(resource), get_comments(resource)), resources)
+            enumerations[label]['set'] = {value: {'comments': comments.replace('\n', ' ').replace('\r', '')} for (value, comments) in enumeration_set}
+            enumerations[label]['comments'] = get_comments(entry)
+        elif is_class(entry):
+            label = get_resource_label(entry)
+            classes[label] = {}
+            classes[label]['super'] = get_superclass(entry) 
+            classes[label]['comments'] = get_comments(entry)
+            classes[label]['properties'] = {}
+            properties = properties_by_domain.get(label, [])
+            for prop in properties:
+                prop_id = get_resource_id(prop)
+                classes[label]['properties'][prop_id] = {}
+                prop_obj = classes[label]['properties'][prop_id]
+                prop_obj['comments'] = get_comments(prop)
+                prop_obj['multiplicity'] = get_property_multiplicity(prop)
+                prop_obj['inverseRoleName'] = get_property_inverse_role_name(prop)
+                if prop.find(__RANGE_TAG) != None:
+                    prop_obj['type'] = prop.find(__RANGE_TAG).attrib[__RESOURCE_ATTRIB].split('#')[1]
+                elif prop.find(__DATATYPE_TAG) != None:
+                    prop_obj['type'] = prop.find(__DATATYPE_TAG).attrib[__RESOURCE_ATTRIB].split('#')[1]
+    
+    # Define all super properties (all class' and its parents' properties).
+    # Parents come first in the sorted order, so their superproperties are ready.
+    for class_name in sort_classes(classes):
+        classes[class_name]['superproperties'] = dict(classes[class_name]['properties'])
+        superclass = classes[class_name]['super']
+        if superclass:
+            classes[class_name]['superproperties'].update(classes[superclass]['superproperties'])
+
+    return enumerations, classes
+
+
+def sort_classes(classes):
+    """Return the class names of `classes` ordered so that every superclass precedes its subclasses.
+
+    Classes are released in passes over the declaration order, as if repeatedly scanning
+    `classes` and picking every class whose superclass was already picked, but each class
+    is visited only once (Kahn's algorithm).
+    Raises ValueError if a superclass is missing from `classes` or if the hierarchy has a cycle.
+    """
+    position = {}
+    subclasses = {}
+    ready = []
+    for i, (class_name, class_detail) in enumerate(classes.items()):
+        position[class_name] = i
+        superclass = class_detail['super']
+        if superclass == '':
+            heapq.heappush(ready, (0, i, class_name))
+        elif superclass not in classes:
+            raise ValueError(f"Class '{class_name}' is a subclass of '{superclass}', which is not defined in the schema")
+        else:
+            subclasses.setdefault(superclass, []).append(class_name)
+
+    names = []
+    while ready:
+        scan, i, class_name = heapq.heappop(ready)
+        names.append(class_name)
+        for subclass in subclasses.get(class_name, ()):
+            # A subclass declared later is still reached in the current pass
+            next_scan = scan if position[subclass] > i else scan + 1
+            heapq.heappush(ready, (next_scan, position[subclass], subclass))
+
+    if len(names) != len(classes):
+        cyclic = sorted(set(classes).difference(names))
+        raise ValueError(f"Cyclic class hierarchy between {', '.join(cyclic)}")
+    return names
+
+
+__DATATYPES = {
+    'float': 'Decimal',
+    'string': 'str',
+    'integer': 'int',
+    'boolean': 'bool'
+}
+
+def property_iterator(properties):
+    for prop_name in properties:
+        new_property = properties[prop_name]
+        dtype = new_property['type'] if new_property['type'] not in __DATATYPES else __DATATYPES[new_property['type']]
+        comments = new_property['comments']
+        inverseRoleName = new_property['inverseRoleName']
+        if '..' in new_property['multiplicity']:
+            minBound, maxBound = new_property['multiplicity'].split('..')
+            minBound = int(minBound)
+            maxBound = float('Inf') if maxBound == 'n' else int(maxBound)
+        elif new_property['multiplicity'] == 'n':
+            minBound, maxBound = 0, float('Inf')
+        else:
+            minBound, maxBound = 2 * [int(new_property['multiplicity'])]
+        yield (prop_name.split(".")[1], dtype, inverseRoleName and inverseRoleName.split(".")[1], minBound, maxBound, comments.replace("\n", " "))
+
+
+def emit_header(base_ns, package=False, schema_hash=''):
+    """Module imports and constants, the `_import` function and the `DocumentCIMRDF` class.
+    `schema_hash` stamps the snapshots saved by the module (see `schema_digest`).
+    """
+    TEXT = '''import gc
+import io
+import json
+import os
+import sys
+from array import array
+from contextlib import contextmanager
+from decimal import Decimal
+from enum import Enum
+from itertools import accumulate, chain, repeat
+from time import perf_counter
+from typing import List, NamedTuple, Union
+from uuid import uuid4 as uuid
+from xml.etree import ElementTree as ET
+
+__RDF_NS = "http://www.w3.org/1999/02/22-rdf-syntax-ns#"
+__RDFS_NS = "http://www.w3.org/2000/01/rdf-schema#"
+__CIMS_NS = "http://iec.ch/TC57/1999/rdf-schema-extensions-19990926#"
+__UML_NS = "http://langdale.com.au/2005/UML#"
+__XSD_NS = "http://www.w3.org/2001/XMLSchema#"
+__XML_NS = "http://www.w3.org/XML/1998/namespace"
+
+__XML_BASE = '{'+__XML_NS+'}base'
+__DESCRIPTION_TAG = '{'+__RDF_NS+'}Description'
+__TYPE_TAG = '{'+__RDF_NS+'}type'
+__LABEL_TAG = '{'+__RDFS_NS+'}label'
+__COMMENT_TAG = '{'+__RDFS_NS+'}comment'
+__RESOURCE_ATTRIB = '{'+__RDF_NS+'}resource'
+__ABOUT_ATTRIB = '{'+__RDF_NS+'}about'
+__ID_ATTRIB = '{'+__RDF_NS+'}ID'
+__STEREOTYPE_TAG = '{'+__CIMS_NS+'}stereotype'
+# Class
+__CLASS_TAG = '{'+__RDFS_NS+'}Class'
+__CLASS_URI = __RDFS_NS+'Class'
+__SUBCLASSOF_TAG = '{'+__RDFS_NS+'}subClassOf'
+# Property
+__PROPERTY_TAG = '{'+__RDF_NS+'}Property'
+__PROPERTY_URI = __RDF_NS+'Property'
+__DOMAIN_TAG = '{'+__RDFS_NS+'}domain'
+__RANGE_TAG = '{'+__RDFS_NS+'}range'
+__MULTIPLICITY_TAG = '{' + __CIMS_NS + '}multiplicity'
+__INVERSEROLE_TAG = '{' + __CIMS_NS + '}inverseRoleName'
+__DATATYPE_TAG = '{'+__CIMS_NS+'}dataType'
+# Enumeration
+__ENUMERATION_URI = __UML_NS+'enumeration'
+# cim data type
+__CIMDATATYPE_URI = __UML_NS+'cimdatatype'
+'''
+    TEXT += f"__BASE_NS = '{base_ns}'"
+    TEXT += f"\n_SCHEMA_HASH = '{schema_hash}'"
+    if package:
+        TEXT += '''
+_pkg = sys.modules[__package__]
+
+class _LazyClasses(dict):
+    """Resource classes by name, imported from the package on first use."""
+    def __missing__(self, name):
+        self[name] = getattr(_pkg, name)
+        return self[name]
+
+_CLASSES = _LazyClasses()'''
+    TEXT += '''
+
+@contextmanager
+def _gc_paused():
+    """Pause the cyclic garbage collector. While many objects are created, the collections it
+    triggers would scan every resource again and again.
+    """
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def _records(resources):
+    """Describe each element of `resources`, an iterable of resource elements (e.g. the children
+    of an rdf:RDF root), as a (class name, URI, properties) record. The class name is None for an
+    rdf:Description without rdf:type, which only adds statements to a resource described elsewhere.
+
+    The properties are a list of (property tag, text, referenced URI) triples, without the namespace
+    of the tag. Records only hold strings, so they are cheap to pickle.
+    """
+    classes = {}
+    names = {}
+
+    for child in resources:
+        tag = child.tag
+        if tag == __DESCRIPTION_TAG:
+            rdf_type = child.find(__TYPE_TAG)
+            tag = None if rdf_type is None else rdf_type.attrib[__RESOURCE_ATTRIB]
+        class_name = classes.get(tag)
+        if class_name is None and tag is not None:
+            class_name = classes[tag] = tag.split('}')[-1].split('#')[-1]
+
+        if __ID_ATTRIB in child.attrib:
+            uri = '#' + child.attrib[__ID_ATTRIB]
+        else:
+            uri = child.attrib[__ABOUT_ATTRIB]
+            uri = '#' + uri.split('#')[1] if '#' in uri else uri
+
+        properties = []
+        for resource_item in child:
+            name = names.get(resource_item.tag)
+            if name is None:
+                name = names[resource_item.tag] = resource_item.tag.split('}')[-1]
+            if resource_item.tag == __TYPE_TAG:
+                continue
+            properties.append((name, resource_item.text, resource_item.get(__RESOURCE_ATTRIB)))
+        yield class_name, uri, properties
+
+
+def _build(records, instrumentation = None):
+    """Build the instances described by `records` (see `_records`) in a single pass.
+
+    A URI seen again (e.g. rdf:about in another file) adds its properties to the existing instance, which
+    may then be described without rdf:type.
+    References to resources that were not created yet are kept in a fixup list and resolved at the end.
+    With an `instrumentation`, the seconds spent in the 'parse' (parsing and describing the elements, or
+    waiting for them), 'create', 'set' and 'resolve' phases and the instances created by class are passed to it.
+    Returns a dict of the instances by URI.
+    """
+    pending = []
+    instances_dict = {}
+    classes = _CLASSES
+    if instrumentation is not None:
+        timings = {'parse': 0.0, 'create': 0.0, 'set': 0.0, 'resolve': 0.0}
+        classes = _TimedClasses(timings)
+        records = _timed(records, timings, 'parse')
+        start = perf_counter()
+
+    for class_name, uri, properties in records:
+        instance = instances_dict.get(uri)
+        if instance is None:
+            if class_name is None:
+                raise ValueError(f'{uri} is described without rdf:type before any description giving its type')
+            instance = instances_dict[uri] = classes[class_name](URI=uri)
+        setters = instance._setters
+
+        for name, text, referenced_resource_uri in properties:
+            if referenced_resource_uri is None:
+                setters[name](instance, text)
+            elif referenced_resource_uri in instances_dict:
+                setters[name](instance, instances_dict[referenced_resource_uri])
+            else:
+                pending.append((instance, setters[name], referenced_resource_uri))
+
+    if instrumentation is not None:
+        built = perf_counter()
+        timings['set'] = built - start - timings['parse'] - timings['create']
+
+    # Resolve forward references
+    for instance, setter, referenced_resource_uri in pending:
+        setter(instance, instances_dict[referenced_resource_uri])
+
+    if instrumentation is not None:
+        timings['resolve'] = perf_counter() - built
+        _report(instrumentation, timings, 'read', classes.counts)
+    return instances_dict
+
+
+def _import(resources, instrumentation = None):
+    """Build the instances described by `resources`, an iterable of resource elements.
+    Returns a dict of the instances by URI.
+    """
+    return _build(_records(resources), instrumentation)
+
+
+def _file_records(filename, backend):
+    """Records of the resources of `filename`, parsed with the XML backend called `backend`."""
+    with _gc_paused():
+        return list(_records(_backend(backend).iterparse(filename)))
+
+
+def _iterparse(source, etree = ET, **options):
+    """Yield the resource elements (the children of rdf:RDF) of `source`, a file name or file object,
+    each one as soon as it is completely parsed by the `iterparse` of `etree`.
+
+    Every element is released once the caller is done with it, so the whole tree is never kept in memory.
+    """
+    depth = 0
+    root = None
+    for event, element in etree.iterparse(source, events=('start', 'end'), **options):
+        if event == 'start':
+            if root is None:
+                root = element
+            depth += 1
+            continue
+        depth -= 1
+        if depth == 1:
+            yield element
+            root.clear()
+
+
+def _indent(element, level = 1, space = '    '):
+    """Indent the descendants of `element`, found at depth `level` of the document, with whitespace
+    in the text and tail of elements (the same layout as ElementTree.indent).
+    """
+    if len(element):
+        indentation = '\\n' + space * (level + 1)
+        if not element.text or not element.text.strip():
+            element.text = indentation
+        for child in element:
+            _indent(child, level + 1, space)
+            if not child.tail or not child.tail.strip():
+                child.tail = indentation
+        if not child.tail.strip():
+            child.tail = indentation[:-len(space)]
+
+
+class _TextWriter():
+    """Adapter writing the bytes of a serialized document to a text stream."""
+    def __init__(self, stream):
+        self.stream = stream
+
+    def write(self, data):
+        # Non-ASCII characters are serialized as character references
+        self.stream.write(data.decode('ascii'))
+
+
+# Resources serialized together by `DocumentCIMRDF.write`: enough to spread the cost of each call to
+# `tostring`, few enough to keep memory bounded
+_WRITE_BATCH = 256
+
+
+# Namespace prefixes of a serialized document, as picked by ElementTree
+_NSMAP = {'ns1': __BASE_NS, 'rdf': __RDF_NS}
+
+
+class _StdlibBackend():
+    """XML backend built on xml.etree.ElementTree, always available."""
+    name = 'stdlib'
+    etree = ET
+
+    def root(self, tag, attrib):
+        return ET.Element(tag, attrib)
+
+    def iterparse(self, source):
+        return _iterparse(source, ET)
+
+
+class _LxmlBackend():
+    """XML backend built on lxml, a C implementation of the ElementTree API."""
+    name = 'lxml'
+
+    def __init__(self):
+        from lxml import etree
+        self.etree = etree
+
+    def root(self, tag, attrib):
+        return self.etree.Element(tag, attrib, nsmap=_NSMAP)
+
+    def iterparse(self, source):
+        # lxml only reads bytes from file objects
+        if isinstance(source, io.TextIOBase):
+            source = io.BytesIO(source.read().encode('utf-8'))
+        return _iterparse(source, self.etree, remove_comments=True, remove_pis=True)
+
+
+_BACKENDS = {'lxml': _LxmlBackend, 'stdlib': _StdlibBackend}
+
+
+def _backend(name = None):
+    """XML backend called `name`, the standard library by default."""
+    if name is None:
+        return _StdlibBackend()
+    if name not in _BACKENDS:
+        raise ValueError(f"Unknown XML backend {name!r} (expected one of {', '.join(_BACKENDS)})")
+    return _BACKENDS[name]()
+
+
+class _UniqueList(list):
+    """List of the values of a multi-valued property, without duplicates.
+
+    Short lists are scanned to check membership. Once a list holds more than `_SET_SIZE` values, its
+    members are also kept in a set, so adding a value takes constant time.
+    Changing the list marks its `owner`, the resource holding it, as not validated.
+    """
+    __slots__ = ('_members', '_owner')
+    _SET_SIZE = 8
+
+    def __init__(self, values = (), owner = None):
+        super().__init__()
+        self._members = None
+        self._owner = owner
+        self.extend(values)
+
+    def __reduce__(self):
+        return (_UniqueList, (list(self), self._owner))
+
+    def _changed(self):
+        if self._owner is not None:
+            self._owner._validated = False
+
+    def __contains__(self, value):
+        if self._members is None:
+            return super().__contains__(value)
+        return value in self._members
+
+    def _rebuild(self):
+        self._members = set(self) if len(self) > self._SET_SIZE else None
+
+    def _added(self, value):
+        self._changed()
+        if self._members is not None:
+            self._members.add(value)
+        elif len(self) > self._SET_SIZE:
+            self._rebuild()
+
+    def add(self, value) -> bool:
+        """Append `value` if not present yet. Returns whether it was appended."""
+        if value in self:
+            return False
+        super().append(value)
+        self._added(value)
+        return True
+
+    append = add
+
+    def extend(self, values):
+        for value in values:
+            self.add(value)
+
+    def __iadd__(self, values):
+        self.extend(values)
+        return self
+
+    def insert(self, index, value):
+        if value not in self:
+            super().insert(index, value)
+            self._added(value)
+
+    def remove(self, value):
+        super().remove(value)
+        self._changed()
+        if self._members is not None:
+            self._members.discard(value)
+
+    def pop(self, index = -1):
+        value = super().pop(index)
+        self._changed()
+        if self._members is not None:
+            self._members.discard(value)
+        return value
+
+    def clear(self):
+        super().clear()
+        self._changed()
+        self._members = None
+
+    def __imul__(self, times):
+        if times <= 0:
+            self.clear()
+        return self
+
+    def __setitem__(self, index, value):
+        """Replace items, skipping values that are already present elsewhere in the list."""
+        if isinstance(index, slice):
+            replaced = set(range(*index.indices(len(self))))
+            present = {item for i, item in enumerate(self) if i not in replaced}
+            values = []
+            for item in value:
+                if item not in present:
+                    present.add(item)
+                    values.append(item)
+            value = values
+        elif value in self and value != self[index]:
+            return
+        super().__setitem__(index, value)
+        self._changed()
+        self._rebuild()
+
+    def __delitem__(self, index):
+        super().__delitem__(index)
+        self._changed()
+        self._rebuild()
+
+
+class _ResourceSet():
+    """Insertion-ordered set of resources, compared by identity and indexed by URI, by class and by mRID.
+    Once `referrers` is first called, resources are also indexed by the resources they reference.
+
+    Indexes are updated as resources are added or removed. A resource whose mRID or references change
+    afterwards must be passed to `reindex`.
+    """
+    def __init__(self, resources = ()):
+        self.__resources = {}
+        self.__uris = {}
+        self.__types = {}
+        self.__mrids = {}
+        self.__referrers = None
+        self.__links = None
+        self.__order = None
+        self.__positions = None
+        for resource in resources:
+            self.add(resource)
+
+    def add(self, resource) -> bool:
+        """Insert `resource` if not present yet. Returns whether it was inserted."""
+        key = id(resource)
+        if key in self.__resources:
+            return False
+        self.__resources[key] = resource
+        self.__uris[resource.URI] = resource
+        members = self.__types.get(type(resource))
+        if members is None:
+            members = self.__types[type(resource)] = {}
+        members[key] = resource
+        mrid = getattr(resource, 'mRID', None)
+        if mrid is not None:
+            self.__mrids[mrid] = resource
+        if self.__referrers is not None:
+            self.__link(resource)
+        if self.__order is not None:
+            self.__positions[key] = len(self.__order)
+            self.__order.append(resource)
+        return True
+
+    append = add
+
+    def discard(self, resource) -> bool:
+        """Remove `resource` if present. Returns whether it was removed."""
+        if self.__resources.pop(id(resource), None) is None:
+            return False
+        if self.__uris.get(resource.URI) is resource:
+            del self.__uris[resource.URI]
+        del self.__types[type(resource)][id(resource)]
+        mrid = getattr(resource, 'mRID', None)
+        if self.__mrids.get(mrid) is resource:
+            del self.__mrids[mrid]
+        if self.__referrers is not None:
+            self.__unlink(resource)
+        self.__order = self.__positions = None
+        return True
+
+    def reindex(self, resource):
+        """Update the mRID and reference indexes after the mRID or references of `resource` changed."""
+        if id(resource) not in self.__resources:
+            return
+        mrid = getattr(resource, 'mRID', None)
+        if mrid is not None:
+            self.__mrids[mrid] = resource
+        if self.__referrers is not None:
+            self.__unlink(resource)
+            self.__link(resource)
+
+    def __link(self, resource):
+        targets = set()
+        for name, kind, value_type, tag, inverse in getattr(resource, '_fields', ()):
+            if kind == 'ref':
+                value = getattr(resource, name)
+                if value is not None:
+                    targets.add(value)
+            elif kind == 'refs':
+                targets.update(getattr(resource, name))
+        self.__links[id(resource)] = targets
+        for target in targets:
+            referrers = self.__referrers.get(target)
+            if referrers is None:
+                referrers = self.__referrers[target] = {}
+            referrers[id(resource)] = resource
+
+    def __unlink(self, resource):
+        for target in self.__links.pop(id(resource), ()):
+            referrers = self.__referrers[target]
+            del referrers[id(resource)]
+            if not referrers:
+                del self.__referrers[target]
+
+    def of_type(self, cls) -> list:
+        """Resources that are instances of `cls` (including its subclasses), grouped by class and in
+        insertion order within a class."""
+        return [resource for member_cls, members in self.__types.items() if issubclass(member_cls, cls) for resource in members.values()]
+
+    def get_by_mrid(self, mrid, default = None):
+        """Resource whose mRID is `mrid`, or `default`."""
+        resource = self.__mrids.get(mrid)
+        # An entry may be left behind by a resource whose mRID changed since
+        return resource if resource is not None and getattr(resource, 'mRID', None) == mrid else default
+
+    def referrers(self, resource) -> list:
+        """Resources referencing `resource` through any of their reference-typed properties, including
+        associations without an inverse property, in insertion order."""
+        if self.__referrers is None:
+            self.__referrers, self.__links = {}, {}
+            for member in self.__resources.values():
+                self.__link(member)
+        return list(self.__referrers.get(resource, {}).values())
+
+    def get(self, uri, default = None):
+        return self.__uris.get(uri, default)
+
+    def __contains__(self, resource):
+        return id(resource) in self.__resources
+
+    def __iter__(self):
+        return iter(self.__resources.values())
+
+    def __len__(self):
+        return len(self.__resources)
+
+    def positions(self) -> dict:
+        """Position of every resource in insertion order, by `id` of the resource."""
+        if self.__order is None:
+            self.__order = list(self.__resources.values())
+            self.__positions = {key: position for position, key in enumerate(self.__resources)}
+        return self.__positions
+
+    def __getitem__(self, index):
+        self.positions()
+        return self.__order[index]
+
+    def __repr__(self):
+        return repr(list(self.__resources.values()))
+
+
+class Violation(NamedTuple):
+    """A property of a resource breaking its multiplicity or datatype."""
+    URI: str
+    resource: str
+    property: str
+    message: str
+
+
+def _violations(resource):
+    return [Violation(resource.URI, type(resource).__name__, prop_name, message) for prop_name, message in resource._check()]
+
+
+class Instrumentation():
+    """Opt-in measurements of the imports and exports of a document, e.g. `DocumentCIMRDF(instrumentation=Instrumentation())`.
+
+    Collects the seconds spent in each phase ('parse', 'create', 'set', 'resolve', 'validate', 'serialize'
+    and 'write'), the resources read and written by class, and the bytes read and written. Override
+    `add_time`, `add_resources` and `add_bytes` to feed the numbers elsewhere (e.g. to a metrics client).
+    """
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.timings = {}
+        self.resources = {'read': {}, 'written': {}}
+        self.bytes = {'read': 0, 'written': 0}
+
+    def add_time(self, phase, seconds):
+        self.timings[phase] = self.timings.get(phase, 0.0) + seconds
+
+    def add_resources(self, operation, class_name, count):
+        """Count `count` resources of class `class_name` 'read' or 'written', as given by `operation`."""
+        counts = self.resources[operation]
+        counts[class_name] = counts.get(class_name, 0) + count
+
+    def add_bytes(self, operation, count):
+        self.bytes[operation] += count
+
+
+class _WriteCounter():
+    """Binary stream counting the bytes written to `stream` for an `Instrumentation`."""
+    def __init__(self, stream, instrumentation):
+        self.stream = stream
+        self.instrumentation = instrumentation
+
+    def write(self, data):
+        self.instrumentation.add_bytes('written', len(data))
+        return self.stream.write(data)
+
+
+def _file_size(source):
+    """Size in bytes of `source`, a file name or a binary file object read to its end (None if unknown)."""
+    if isinstance(source, (str, os.PathLike)):
+        return os.path.getsize(source)
+    if isinstance(source, (io.RawIOBase, io.BufferedIOBase)) and source.seekable():
+        return source.tell()
+    return None
+
+
+class _TimedClasses():
+    """Resource classes by name, like `_CLASSES`, whose instantiations are timed in `timings['create']`
+    and counted by class name in `counts`."""
+    def __init__(self, timings):
+        self.timings = timings
+        self.counts = {}
+
+    def __getitem__(self, class_name):
+        cls = _CLASSES[class_name]
+        def create(**kwargs):
+            start = perf_counter()
+            instance = cls(**kwargs)
+            self.timings['create'] += perf_counter() - start
+            self.counts[class_name] = self.counts.get(class_name, 0) + 1
+            return instance
+        return create
+
+
+def _timed(iterable, timings, phase):
+    """Yield the items of `iterable`, adding the seconds spent waiting for each one to `timings[phase]`."""
+    iterator = iter(iterable)
+    while True:
+        start = perf_counter()
+        try:
+            item = next(iterator)
+        except StopIteration:
+            return
+        finally:
+            timings[phase] += perf_counter() - start
+        yield item
+
+
+def _serialized(resources, validate, etree, timings = None, counts = None):
+    """Yield the element of each resource, built by `etree`. With `timings` and `counts` (dicts), the seconds
+    spent in the 'validate' and 'serialize' phases and the resources by class are added to them."""
+    if timings is None:
+        for resource in resources:
+            yield resource.serialize(validate, etree)
+        return
+    for phase in ('validate', 'serialize'):
+        timings.setdefault(phase, 0.0)
+    for resource in resources:
+        start = perf_counter()
+        if validate:
+            resource._validate_once()
+        validated = perf_counter()
+        element = resource._serialize(etree)
+        timings['serialize'] += perf_counter() - validated
+        timings['validate'] += validated - start
+        class_name = type(resource).__name__
+        counts[class_name] = counts.get(class_name, 0) + 1
+        yield element
+
+
+def _report(instrumentation, timings, operation = None, counts = None):
+    """Pass the seconds by phase of `timings`, and the resources by class of `counts` for `operation`
+    ('read' or 'written'), to `instrumentation`."""
+    for phase, seconds in timings.items():
+        instrumentation.add_time(phase, seconds)
+    for class_name, count in (counts or {}).items():
+        instrumentation.add_resources(operation, class_name, count)
+
+
+class _Stubs(dict):
+    """Pickler dispatch table storing every resource it meets as a bare instance of its class."""
+    def __missing__(self, cls):
+        if not hasattr(cls, '_references'):
+            raise KeyError(cls)
+        import copyreg
+        reduce = self[cls] = lambda resource: (copyreg.__newobj__, (type(resource),))
+        return reduce
+
+
+def _dump_shallow(resources):
+    """Pickle the class and attributes of each resource. Linked resources are kept as bare instances,
+    which is enough to check their datatype, so the pickle does not grow with the graph's depth.
+    """
+    import pickle
+    stream = io.BytesIO()
+    pickler = pickle.Pickler(stream, pickle.HIGHEST_PROTOCOL)
+    pickler.dispatch_table = _Stubs()
+    pickler.dump([(type(resource), resource.__reduce_ex__(2)[2]) for resource in resources])
+    return stream.getvalue()
+
+
+def _load_shallow(data):
+    import pickle
+    resources = []
+    for cls, state in pickle.loads(data):
+        resource = cls.__new__(cls)
+        # Instances of classes with __slots__ are pickled as a (__dict__, slot values) pair
+        state, slots = state if isinstance(state, tuple) else (state, None)
+        for name, value in (slots or {}).items():
+            setattr(resource, name, value)
+        if state:
+            resource.__dict__.update(state)
+        resources.append(resource)
+    return resources
+
+
+def _check_shallow(data):
+    return [violation for resource in _load_shallow(data) for violation in _violations(resource)]
+
+
+# Resources checked by forked worker processes, which inherit them instead of receiving a pickle
+_forked_resources = []
+
+
+def _check_forked(start, stop):
+    return [violation for resource in _forked_resources[start:stop] for violation in _violations(resource)]
+
+
+_SNAPSHOT_MAGIC = b'CIMSNAP1'
+
+
+def _text(value):
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    return value.value if isinstance(value, Enum) else str(value)
+
+
+def _text_type(value_type):
+    return (lambda text: text == 'true') if value_type is bool else value_type
+
+
+def _save_snapshot(resources, stream):
+    """Write `resources` column by column: one `array('i')` per class and property, holding indexes into a
+    table of unique strings for values and document positions for references."""
+    positions = {id(resource): position for position, resource in enumerate(resources)}
+    strings = {}
+    def string(text):
+        return strings.setdefault(text, len(strings))
+    def position(resource):
+        try:
+            return positions[id(resource)]
+        except KeyError:
+            raise ValueError(f'{resource.URI} is referenced but not part of the document') from None
+    blobs, size = [], 0
+    def column(values):
+        nonlocal size
+        blob = array('i', values).tobytes()
+        blobs.append(blob)
+        size += len(blob)
+        return [size - len(blob), len(blob)]
+    members = {}
+    for index, resource in enumerate(resources):
+        members.setdefault(type(resource), []).append(index)
+    classes = []
+    for cls, order in members.items():
+        items = [resources[index] for index in order]
+        columns = {'order': column(order), 'URI': column(string(item.URI) for item in items)}
+        for name, kind, value_type, tag, inverse in cls._fields:
+            values = [getattr(item, name) for item in items]
+            if kind == 'value':
+                columns[name] = column(-1 if value is None else string(_text(value)) for value in values)
+            elif kind == 'ref':
+                columns[name] = column(-1 if value is None else position(value) for value in values)
+            else:
+                encode = (lambda value: string(_text(value))) if kind == 'values' else position
+                offsets = list(chain((0,), accumulate(len(value) for value in values)))
+                columns[name] = column(offsets) + column(encode(value) for value in chain.from_iterable(values))
+        classes.append({'name': cls.__name__, 'count': len(items), 'columns': columns})
+    table = '\\0'.join(strings).encode('utf-8')
+    if table.count(b'\\0') != max(len(strings) - 1, 0):
+        raise ValueError('strings containing NUL characters cannot be saved in a snapshot')
+    header = json.dumps({'schema': _SCHEMA_HASH, 'byteorder': sys.byteorder, 'resources': len(resources),
+                         'strings': [size, len(table)], 'classes': classes}).encode('utf-8')
+    header += b' ' * (-(len(_SNAPSHOT_MAGIC) + 8 + len(header)) % 8)
+    stream.write(_SNAPSHOT_MAGIC + len(header).to_bytes(8, 'little') + header)
+    for blob in blobs:
+        stream.write(blob)
+    stream.write(table)
+
+
+def _load_snapshot(filename):
+    """Resources of a snapshot, created without running `__init__` or the property setters."""
+    import mmap
+    with open(filename, 'rb') as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        if mapped[:len(_SNAPSHOT_MAGIC)] != _SNAPSHOT_MAGIC:
+            raise ValueError(f'{filename} is not a snapshot')
+        start = len(_SNAPSHOT_MAGIC) + 8
+        start += int.from_bytes(mapped[start - 8:start], 'little')
+        header = json.loads(mapped[len(_SNAPSHOT_MAGIC) + 8:start])
+        if header['schema'] != _SCHEMA_HASH:
+            raise ValueError(f'{filename} was saved from another schema or generator version')
+        if header['byteorder'] != sys.byteorder:
+            raise ValueError(f'{filename} was saved on a {header["byteorder"]}-endian machine')
+        view = memoryview(mapped)
+        try:
+            def column(offset, length):
+                with view[start + offset:start + offset + length] as blob, blob.cast('i') as values:
+                    return values.tolist()
+            with view[start + header['strings'][0]:start + sum(header['strings'])] as blob:
+                strings = str(blob, 'utf-8').split('\\0')
+            resources = [None] * header['resources']
+            created = []
+            for entry in header['classes']:
+                cls = _CLASSES[entry['name']]
+                items = [cls.__new__(cls) for _ in range(entry['count'])]
+                for index, item in zip(column(*entry['columns']['order']), items):
+                    resources[index] = item
+                created.append((cls, items, entry['columns']))
+            for cls, items, columns in created:
+                for item, index in zip(items, column(*columns['URI'])):
+                    item.URI = strings[index]
+                    item._validated = False
+                for name, kind, value_type, tag, inverse in cls._fields:
+                    if kind == 'value':
+                        decode = _text_type(value_type)
+                        values = [None if index < 0 else decode(strings[index]) for index in column(*columns[name])]
+                    elif kind == 'ref':
+                        values = [None if index < 0 else resources[index] for index in column(*columns[name])]
+                    else:
+                        offsets, flat = column(*columns[name][:2]), column(*columns[name][2:])
+                        if kind == 'values':
+                            decode = _text_type(value_type)
+                            flat = [decode(strings[index]) for index in flat]
+                        else:
+                            flat = [resources[index] for index in flat]
+                        values = [_UniqueList(flat[offsets[i]:offsets[i + 1]], items[i]) for i in range(len(items))]
+                    for item, value in zip(items, values):
+                        setattr(item, name, value)
+        finally:
+            view.release()
+    return resources
+
+
+# IEC 61970-552 difference models
+_DM_NS = 'http://iec.ch/2002/schema/CIM_difference_model#'
+_DIFFERENCE_MODEL_TAG = '{' + _DM_NS + '}DifferenceModel'
+_FORWARD_TAG = '{' + _DM_NS + '}forwardDifferences'
+_REVERSE_TAG = '{' + _DM_NS + '}reverseDifferences'
+_PARSE_TYPE_ATTRIB = '{' + __RDF_NS + '}parseType'
+_FIELDS_BY_TAG = {}
+
+
+def _fields_by_tag(cls):
+    fields = _FIELDS_BY_TAG.get(cls)
+    if fields is None:
+        fields = _FIELDS_BY_TAG[cls] = {field[3]: field for field in cls._fields}
+    return fields
+
+
+def _statements(resource):
+    """Yield the properties of `resource` as (property tag, text, referenced URI) triples, like `_records`."""
+    for name, kind, value_type, tag, inverse in resource._fields:
+        value = getattr(resource, name)
+        if value is None:
+            continue
+        if kind == 'value':
+            yield tag, _text(value), None
+        elif kind == 'ref':
+            yield tag, None, value.URI
+        elif kind == 'values':
+            for item in value:
+                yield tag, _text(item), None
+        else:
+            for item in value:
+                yield tag, None, item.URI
+
+
+def _unlink(resource, field, text, uri):
+    """Remove the value of the property `field` of `resource` matching `text` (or `uri` for references),
+    and `resource` from the inverse property of the referenced resource."""
+    name, kind, value_type, tag, inverse = field
+    current = getattr(resource, name)
+    if kind in ('value', 'ref'):
+        target, current = current, None
+        setattr(resource, name, None)
+    else:
+        target = next((item for item in current if (item.URI == uri if uri is not None else _text(item) == text)), None)
+        if target is None:
+            # Already removed along with its inverse
+            return
+        current.remove(target)
+    resource._validated = False
+    if inverse is not None and target is not None:
+        linked = getattr(target, inverse, None)
+        if isinstance(linked, list):
+            if resource in linked:
+                linked.remove(resource)
+        elif linked is resource:
+            setattr(target, inverse, None)
+        target._validated = False
+
+
+def _forward_value(field, text):
+    """`text` converted like the setter of the property `field` (see `_fields`) does, so that a value the
+    setter would reject raises a ValueError before anything is changed."""
+    name, kind, value_type, tag, inverse = field
+    if value_type is bool or (text is None and kind == 'value'):
+        return text
+    try:
+        return value_type(text)
+    except (TypeError, ValueError, ArithmeticError):
+        raise ValueError(f'Invalid value {text!r} for {tag}') from None
+
+
+def _apply_difference(resources, forward, reverse):
+    """Patch `resources`, a `_ResourceSet`, with the records (see `_records`) of the forward and reverse
+    differences of a difference model: the reverse statements are removed, then the forward statements are
+    added. Resources left without statements by the reverse differences are removed, and resources unknown
+    to `resources` are created by the forward differences, which must then give their rdf:type. A resource
+    given another class by the forward differences is replaced by a new instance, provided the reverse
+    differences remove all its statements.
+
+    Everything is checked, and every forward value converted, first, so a difference model that does not
+    apply leaves `resources` untouched.
+    """
+    removals = []
+    removed = {}
+    for class_name, uri, properties in reverse:
+        resource = resources.get(uri)
+        if resource is None:
+            raise ValueError(f'{uri} is changed by the reverse differences but is not in the document')
+        fields = _fields_by_tag(type(resource))
+        present = set(_statements(resource))
+        for name, text, referenced_uri in properties:
+            text = None if referenced_uri is not None else text
+            if (name, text, referenced_uri) not in present:
+                raise ValueError(f'{uri} has no {name} {referenced_uri or text!r} to remove')
+            removals.append((resource, fields[name], text, referenced_uri))
+            removed.setdefault(uri, set()).add((name, text, referenced_uri))
+
+    created = {}
+    replaced = {}
+    for class_name, uri, properties in forward:
+        resource = resources.get(uri)
+        if uri in created or class_name is None or (resource is not None and type(resource).__name__ == class_name):
+            continue
+        if resource is not None:
+            if removed.get(uri, set()) != set(_statements(resource)):
+                raise ValueError(f'{uri} is turned from a {type(resource).__name__} into a {class_name}, '
+                                 'but the reverse differences do not remove all its statements')
+            replaced[uri] = resource
+        created[uri] = _CLASSES[class_name](URI=uri)
+    additions = []
+    for class_name, uri, properties in forward:
+        resource = created.get(uri) or resources.get(uri)
+        if resource is None:
+            raise ValueError(f'{uri} is not in the document and is described without rdf:type by the forward differences')
+        fields, setters = _fields_by_tag(type(resource)), resource._setters
+        for name, text, referenced_uri in properties:
+            field = fields.get(name)
+            if field is None:
+                raise ValueError(f'{uri} is a {type(resource).__name__}, which has no property {name}')
+            if field[1] in ('ref', 'refs'):
+                value = created.get(referenced_uri) or resources.get(referenced_uri)
+                if value is None:
+                    raise ValueError(f'{uri} references {referenced_uri} through {name}, but it is not in the document')
+            else:
+                value = _forward_value(field, text)
+            additions.append((resource, field, setters[name], value))
+
+    for resource, field, text, referenced_uri in removals:
+        _unlink(resource, field, text, referenced_uri)
+        resources.reindex(resource)
+        if referenced_uri is not None:
+            resources.reindex(resources.get(referenced_uri))
+    described = {uri for class_name, uri, properties in forward}
+    for class_name, uri, properties in reverse:
+        resource = resources.get(uri)
+        if uri not in described and resource is not None and next(_statements(resource), None) is None:
+            resources.discard(resource)
+    relinked = []
+    for uri, resource in replaced.items():
+        # References without an inverse property, left to the replaced resource, now point to its successor
+        for referrer in resources.referrers(resource):
+            relinked.append(referrer)
+            for name, kind, value_type, tag, inverse in referrer._fields:
+                value = getattr(referrer, name)
+                if kind == 'ref' and value is resource:
+                    setattr(referrer, name, created[uri])
+                elif kind == 'refs' and resource in value:
+                    value[value.index(resource)] = created[uri]
+            referrer._validated = False
+        resources.discard(resource)
+    for resource in created.values():
+        resources.add(resource)
+    for referrer in relinked:
+        resources.reindex(referrer)
+    for resource, field, setter, value in additions:
+        current = getattr(resource, field[0])
+        # A single reference replaced without a reverse statement still unlinks the previous resource
+        if field[1] == 'ref' and current is not None and current is not value:
+            _unlink(resource, field, None, current.URI)
+            resources.reindex(current)
+        setter(resource, value)
+        resources.reindex(resource)
+        if field[4] is not None:
+            resources.reindex(value)
+
+
+def _difference(old, new):
+    """Forward and reverse difference records (see `_records`) turning `old` into `new`, both `_ResourceSet`."""
+    forward, reverse = [], []
+    for resource in new:
+        previous = old.get(resource.URI)
+        statements = list(_statements(resource))
+        if previous is None or type(previous) is not type(resource):
+            forward.append((type(resource).__name__, resource.URI, statements))
+            if previous is not None:
+                reverse.append((type(previous).__name__, previous.URI, list(_statements(previous))))
+            continue
+        before = list(_statements(previous))
+        before_set, after_set = set(before), set(statements)
+        added = [statement for statement in statements if statement not in before_set]
+        removed = [statement for statement in before if statement not in after_set]
+        if added:
+            forward.append((type(resource).__name__, resource.URI, added))
+        if removed:
+            reverse.append((type(resource).__name__, resource.URI, removed))
+    for resource in old:
+        if new.get(resource.URI) is None:
+            reverse.append((type(resource).__name__, resource.URI, list(_statements(resource))))
+    return forward, reverse
+
+
+def _difference_model(root, forward, reverse, etree = ET):
+    """Append to `root` a difference model element holding the `forward` and `reverse` difference records."""
+    SubElement = etree.SubElement
+    model = SubElement(root, _DIFFERENCE_MODEL_TAG, {__ABOUT_ATTRIB: '#_' + str(uuid())})
+    for tag, records in ((_FORWARD_TAG, forward), (_REVERSE_TAG, reverse)):
+        part = SubElement(model, tag, {_PARSE_TYPE_ATTRIB: 'Statements'})
+        for class_name, uri, properties in records:
+            element = SubElement(part, '{' + __BASE_NS + '}' + class_name, {__ABOUT_ATTRIB: uri})
+            for name, text, referenced_uri in properties:
+                if referenced_uri is None:
+                    SubElement(element, '{' + __BASE_NS + '}' + name).text = text
+                else:
+                    SubElement(element, '{' + __BASE_NS + '}' + name, {__RESOURCE_ATTRIB: referenced_uri})
+    return model
+
+
+def _numpy():
+    try:
+        import numpy
+    except ImportError as error:
+        raise ImportError('Columns require NumPy (pip install cimrdf.py[numpy])') from error
+    return numpy
+
+
+def _columns_fields(cls, names):
+    """Fields of `cls` (see `_fields`) by property name, for the properties called `names` (all by default)."""
+    fields = {field[3].split('.')[1]: field for field in cls._fields}
+    if names is None:
+        return fields
+    unknown = [name for name in names if name not in fields]
+    if unknown:
+        raise ValueError(f"{cls.__name__} has no propert{'ies' if len(unknown) > 1 else 'y'} {', '.join(unknown)}")
+    return {name: fields[name] for name in names}
+
+
+def _to_column(numpy, values, kind, value_type, positions):
+    """NumPy array of the values of a property: references as positions (-1 for None), numbers as
+    floats (NaN for None) unless all present, and other values as objects."""
+    if kind == 'ref':
+        return numpy.array([-1 if value is None else positions[id(value)] for value in values], dtype=numpy.int64)
+    if kind == 'refs':
+        column = numpy.empty(len(values), dtype=object)
+        column[:] = [numpy.array([positions[id(item)] for item in value], dtype=numpy.int64) for value in values]
+        return column
+    if kind == 'values':
+        column = numpy.empty(len(values), dtype=object)
+        column[:] = [numpy.array(value, dtype=object) for value in values]
+        return column
+    if value_type in (Decimal, int, bool):
+        if None in values:
+            return numpy.array([numpy.nan if value is None else float(value) for value in values], dtype=numpy.float64)
+        return numpy.array(values, dtype={Decimal: numpy.float64, int: numpy.int64, bool: numpy.bool_}[value_type])
+    column = numpy.empty(len(values), dtype=object)
+    column[:] = values
+    return column
+
+
+def _from_value(value, value_type):
+    if value is None or value != value:
+        # None, or NaN
+        return None
+    if value_type is Decimal:
+        return Decimal(str(value))
+    return value_type(value)
+
+
+def _assign_column(resources, rows, field, column):
+    """Set the property `field` (see `_fields`) of the resources `rows` to the values of `column`, as
+    returned by `_to_column`. References are positions in `resources`, a `_ResourceSet`."""
+    name, kind, value_type, tag, inverse = field
+    column = column.tolist() if hasattr(column, 'tolist') else list(column)
+    for resource, value in zip(rows, column):
+        if kind == 'value':
+            setattr(resource, name, _from_value(value, value_type))
+        elif kind == 'values':
+            setattr(resource, name, _UniqueList((_from_value(item, value_type) for item in value), resource))
+        elif kind == 'ref':
+            value = None if value < 0 else resources[value]
+            current = getattr(resource, name)
+            if current is value:
+                continue
+            if current is not None:
+                _unlink(resource, field, None, current.URI)
+                resources.reindex(current)
+            if value is not None:
+                resource._setters[tag](resource, value)
+                resources.reindex(value)
+        else:
+            for item in list(getattr(resource, name)):
+                _unlink(resource, field, None, item.URI)
+                resources.reindex(item)
+            for position in value:
+                item = resources[position]
+                resource._setters[tag](resource, item)
+                resources.reindex(item)
+        resource._validated = False
+        resources.reindex(resource)
+'''      
+    TEXT += f'''
+class DocumentCIMRDF():
+    PRIMITIVES = ({', '.join(primitive for primitive in __DATATYPES.values())})
+
+    def __init__(self, resources = [], backend = None, instrumentation = None):
+        self.resources = resources
+        self.backend = backend
+        # Optional `Instrumentation` collecting timings, resource counts and bytes of imports and exports
+        self.instrumentation = instrumentation
+
+    @property
+    def resources(self) -> _ResourceSet:
+        return self.__resources
+    @resources.setter
+    def resources(self, resources):
+        self.__resources = _ResourceSet(resources)
+
+    @property
+    def backend(self) -> str:
+        """Name of the XML library used to write and parse the document: 'lxml' or 'stdlib'.
+        Setting it to None picks the standard library. `pack` always uses the standard library.
+        """
+        return self.__backend.name
+    @backend.setter
+    def backend(self, name):
+        self.__backend = _backend(name)
+
+    def get(self, uri, default = None):
+        """Resource whose URI is `uri` (e.g. '#_1234'), or `default`."""
+        return self.__resources.get(uri, default)
+
+    def __contains__(self, item):
+        """Whether the resource, or a resource with the given URI, is in the document."""
+        if isinstance(item, str):
+            return self.__resources.get(item) is not None
+        return item in self.__resources
+
+    def of_type(self, cls) -> list:
+        """Resources that are instances of `cls`, e.g. `of_type(ConductingEquipment)` includes the switches."""
+        return self.__resources.of_type(cls)
+
+    def get_by_mrid(self, mrid, default = None):
+        """Resource whose mRID is `mrid`, or `default`."""
+        return self.__resources.get_by_mrid(mrid, default)
+
+    def referrers(self, resource) -> list:
+        """Resources of the document referencing `resource`, whether or not the association has an inverse
+        property. The index is built on the first call and then kept up to date as resources are added.
+        """
+        return self.__resources.referrers(resource)
+
+    def reindex(self, *resources):
+        """Update the mRID and reference indexes for `resources` (by default, all of them) after their mRID
+        or references were changed while they were in the document.
+        """
+        for resource in resources or list(self.__resources):
+            self.__resources.reindex(resource)
+
+    def to_columns(self, cls, props = None) -> dict:
+        """NumPy arrays of the properties `props` (all by default) of the resources of class `cls` (including
+        its subclasses), by property name. Rows follow the document order, and the 'index' array holds
+        the position of each row in `resources`.
+
+        References are positions in `resources` (-1 for None). Numbers are float64 (NaN for None), or
+        int64/bool if no value is missing; other values are object arrays. Multi-valued properties are
+        object arrays holding one array per row.
+        """
+        numpy = _numpy()
+        positions = self.__resources.positions()
+        rows = sorted(self.__resources.of_type(cls), key=lambda resource: positions[id(resource)])
+        columns = {{'index': numpy.array([positions[id(resource)] for resource in rows], dtype=numpy.int64)}}
+        for name, (attribute, kind, value_type, tag, inverse) in _columns_fields(cls, props).items():
+            values = [getattr(resource, attribute) for resource in rows]
+            columns[name] = _to_column(numpy, values, kind, value_type, positions)
+        return columns
+
+    def from_columns(self, cls, columns):
+        """Set properties of the resources of class `cls` in bulk from `columns`, arrays (or sequences) by
+        property name laid out as by `to_columns`: one value per row, in the same order. NaN and None
+        unset a property, and references (positions in `resources`, -1 for None) update the inverse
+        properties too. An 'index' column is ignored.
+        """
+        positions = self.__resources.positions()
+        rows = sorted(self.__resources.of_type(cls), key=lambda resource: positions[id(resource)])
+        columns = {{name: column for name, column in columns.items() if name != 'index'}}
+        for name, field in _columns_fields(cls, list(columns)).items():
+            if len(columns[name]) != len(rows):
+                raise ValueError(f'Column {{name}} has {{len(columns[name])}} values for {{len(rows)}} resources of {{cls.__name__}}')
+            _assign_column(self.__resources, rows, field, columns[name])
+
+    def validate_all(self, processes = None) -> List[Violation]:
+        """Check the multiplicity and datatype of every property of every resource, and return all the
+        violations found, in document order (an empty list if the document is valid).
+
+        With `processes`, the resources are checked by that many worker processes. Where processes cannot
+        be forked, the resources are pickled for the workers, so the generated module must be importable.
+        """
+        global _forked_resources
+        start = perf_counter()
+        resources = list(self.__resources)
+        if processes is None:
+            report = [violation for resource in resources for violation in _violations(resource)]
+        else:
+            import multiprocessing
+            from concurrent.futures import ProcessPoolExecutor
+            size = max(1, -(-len(resources) // (4 * processes)))
+            starts = range(0, len(resources), size)
+            if 'fork' in multiprocessing.get_all_start_methods():
+                _forked_resources = resources
+                try:
+                    with ProcessPoolExecutor(processes, multiprocessing.get_context('fork')) as executor:
+                        results = list(executor.map(_check_forked, starts, [start + size for start in starts]))
+                finally:
+                    _forked_resources = []
+            else:
+                with ProcessPoolExecutor(processes) as executor:
+                    results = list(executor.map(_check_shallow, (_dump_shallow(resources[start:start + size]) for start in starts)))
+            report = [violation for violations in results for violation in violations]
+        # Resources without violations need not be validated again when exported
+        invalid = {{violation.URI for violation in report}}
+        for resource in resources:
+            resource._validated = resource.URI not in invalid
+        if self.instrumentation is not None:
+            self.instrumentation.add_time('validate', perf_counter() - start)
+        return report
+
+    def add_elements(self, elements: Union[ET.Element, List[ET.Element]]):
+        elements = elements if isinstance(elements, list) else [elements]
+        for element in elements:
+            self.resources.add(element)
+
+    def add_recursively(self, elements: Union[ET.Element, List[ET.Element]]):
+        elements = elements if isinstance(elements, list) else [elements]
+        # Depth-first walk over the reference-typed properties of each new element
+        pending = [element for element in reversed(elements) if element != None and all(not isinstance(element, primitive) for primitive in DocumentCIMRDF.PRIMITIVES) and not isinstance(element, Enum)]
+        while pending:
+            element = pending.pop()
+            if not self.resources.add(element):
+                continue
+            linked = []
+            for prop_name in element._references:
+                value = getattr(element, prop_name)
+                if isinstance(value, list):
+                    linked.extend(value)
+                elif value is not None:
+                    linked.append(value)
+            pending.extend(reversed(linked))
+
+    def dump(self, stream = None, pretty = True, validate = True):
+        """Write the document to `stream`, a text or binary file object (the standard output by default),
+        indented unless `pretty` is False. Like `write`, it goes a batch of resources at a time.
+        """
+        stream = sys.stdout if stream is None else stream
+        self.write(_TextWriter(stream) if isinstance(stream, io.TextIOBase) else stream, validate, pretty)
+    
+    def __root(self, backend = None):
+        return (backend or self.__backend).root('{'{'+__RDF_NS+'}'}RDF', {"{'"+__XML_BASE+"': '"+base_ns.replace('#','')+"/new_resource#'}"})
+
+    def pack(self, validate = True) -> ET.ElementTree:
+        """ElementTree of the document. Whatever the backend, it is built with the standard library
+        (xml.etree.ElementTree), which builds trees several times faster than lxml.
+        """
+        root = self.__root(_StdlibBackend())
+        timings, counts = (None, None) if self.instrumentation is None else (dict(), dict())
+        with _gc_paused():
+            for element in _serialized(self.resources, validate, ET, timings, counts):
+                root.append(element)
+        if timings is not None:
+            _report(self.instrumentation, timings, 'written', counts)
+        return ET.ElementTree(root)
+
+    def write(self, stream, validate = True, pretty = False):
+        """Serialize the document into the binary `stream` (any object with a `write` method),
+        a batch of resources at a time. The output is the same as `tostring()`. With `validate=False` the
+        resources are not validated before being serialized. With `pretty=True` every element
+        starts on a new, indented line.
+        """
+        etree = self.__backend.etree
+        root = self.__root()
+        if pretty:
+            # Written before every resource
+            root.text = '\\n    '
+        timings = counts = None
+        if self.instrumentation is not None:
+            timings, counts, start = dict(), dict(), perf_counter()
+            stream = _WriteCounter(stream, self.instrumentation)
+        header = footer = None
+        def flush():
+            nonlocal header, footer
+            # Serialized inside an otherwise empty root, so namespace prefixes match the whole document's
+            data = etree.tostring(root)
+            del root[:]
+            if header is None:
+                header, footer = data[:data.index(b'>') + 1], data[data.rindex(b'</'):]
+                stream.write(header)
+            stream.write(data[len(header):-len(footer)])
+        for element in _serialized(self.resources, validate, etree, timings, counts):
+            if pretty:
+                _indent(element)
+                if len(root):
+                    root[-1].tail = root.text
+            root.append(element)
+            if len(root) == _WRITE_BATCH:
+                flush()
+        if len(root):
+            flush()
+        if footer is None:
+            root.text = None
+            stream.write(etree.tostring(root))
+        else:
+            stream.write(b'\\n' + footer if pretty else footer)
+        if pretty:
+            stream.write(b'\\n')
+        if timings is not None:
+            # Writing is whatever was not spent validating and serializing
+            timings['write'] = perf_counter() - start - sum(timings.values())
+            _report(self.instrumentation, timings, 'written', counts)
+
+    def tostring(self, validate = True, pretty = False):
+        stream = io.BytesIO()
+        self.write(stream, validate, pretty)
+        return stream.getvalue()
+
+    def fromstring(self, xml):
+        source = io.BytesIO(xml) if isinstance(xml, bytes) else io.StringIO(xml)
+        with _gc_paused():
+            self.resources = list(_import(self.__backend.iterparse(source), self.instrumentation).values())
+        if self.instrumentation is not None:
+            self.instrumentation.add_bytes('read', len(xml) if isinstance(xml, bytes) else len(xml.encode('utf-8')))
+
+    def tofile(self, filename, validate = True, pretty = False):
+        """Save the document to `filename`, or write it to `filename` if it is a binary file object."""
+        if hasattr(filename, 'write'):
+            self.write(filename, validate, pretty)
+            return
+        with open(filename, 'wb') as file:
+            self.write(file, validate, pretty)
+
+    def fromfile(self, filename):
+        with _gc_paused():
+            self.resources = list(_import(self.__backend.iterparse(filename), self.instrumentation).values())
+        if self.instrumentation is not None and _file_size(filename) is not None:
+            self.instrumentation.add_bytes('read', _file_size(filename))
+
+    def save_snapshot(self, filename):
+        """Save the resources to `filename` in a binary format that `load_snapshot` reloads much faster than
+        `fromfile` parses XML. A snapshot can only be loaded by a module generated from the same schema by
+        the same generator version; it is meant as a cache, not as an exchange format."""
+        with open(filename, 'wb') as file:
+            _save_snapshot(list(self.__resources), file)
+
+    def load_snapshot(self, filename):
+        """Replace the resources with those of a snapshot saved by `save_snapshot`. Raises `ValueError`
+        if the snapshot was saved by a module generated from another schema or generator version."""
+        with _gc_paused():
+            self.resources = _load_snapshot(filename)
+
+    def load_many(self, filenames, processes = None):
+        """Load several files describing one model (e.g. the EQ, TP, SSH, SV and DL profiles of a CGMES
+        model) as a single document. Resources described in several files are merged, and references
+        may point to resources of any of the files.
+
+        The files are parsed by `processes` worker processes (by default, one per CPU) while the
+        resources of the files already parsed are built here. With `processes=1` they are parsed here.
+        """
+        filenames = list(filenames)
+        if self.instrumentation is not None:
+            self.instrumentation.add_bytes('read', sum(os.path.getsize(filename) for filename in filenames))
+        if processes == 1 or len(filenames) < 2:
+            with _gc_paused():
+                records = chain.from_iterable(_records(self.__backend.iterparse(filename)) for filename in filenames)
+                self.resources = list(_build(records, self.instrumentation).values())
+            return
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(min(processes or os.cpu_count() or 1, len(filenames))) as executor, _gc_paused():
+            # Workers parse the files: 'parse' is the time spent waiting for their records
+            records = chain.from_iterable(executor.map(_file_records, filenames, repeat(self.backend)))
+            self.resources = list(_build(records, self.instrumentation).values())
+
+    def apply_difference(self, source):
+        """Patch the document in place with the IEC 61970-552 difference model of `source`, a file name or
+        file object: the statements of its reverse differences are removed and those of its forward
+        differences are added. Resources are found through the URI index, so the cost depends on the size
+        of the difference, not of the document.
+
+        Resources left without any statement are removed, and new resources are created. Raises
+        `ValueError`, leaving the document unchanged, if a statement to remove is not in the document, a
+        reference points to a missing resource or a value to add is invalid.
+        """
+        forward, reverse = [], []
+        for element in self.__backend.iterparse(source):
+            if element.tag != _DIFFERENCE_MODEL_TAG:
+                continue
+            for part in element:
+                if part.tag == _FORWARD_TAG:
+                    forward.extend(_records(part))
+                elif part.tag == _REVERSE_TAG:
+                    reverse.extend(_records(part))
+        _apply_difference(self.__resources, forward, reverse)
+
+    def write_difference(self, other, stream, pretty = False):
+        """Write into the binary `stream` the IEC 61970-552 difference model turning this document into
+        `other`, another document: applied to this document with `apply_difference`, it gives the resources
+        and properties of `other`. Resources are matched by URI.
+        """
+        forward, reverse = _difference(self.__resources, other.resources)
+        root = self.__root()
+        _difference_model(root, forward, reverse, self.__backend.etree)
+        if pretty:
+            _indent(root, 0)
+        stream.write(self.__backend.etree.tostring(root))
+        if pretty:
+            stream.write(b'\\n')
+
+    def difference(self, other, pretty = False) -> bytes:
+        """IEC 61970-552 difference model turning this document into `other` (see `write_difference`)."""
+        stream = io.BytesIO()
+        self.write_difference(other, stream, pretty)
+        return stream.getvalue()
+
+'''
+    return TEXT
+
+
+def emit_enumeration(enum, enumeration):
+    TEXT = f'''
+class {enum}(str, Enum):
+    """{enumeration['comments']}"""'''
+    for enum_value in enumeration['set']:
+        TEXT += f'''
+    {enum_value} = '{enum_value}' # {enumeration['set'][enum_value]['comments']} '''
+    TEXT += '\n'
+    return TEXT
+
+
+def emit_class(class_name, classes, enumerations, base_ns, package=False, slots=False):
+    class_detail = classes[class_name]
+
+    def ref(dtype):
+        # In package mode, generated types are looked up lazily through the package
+        return f'_pkg.{dtype}' if package and dtype not in __DATATYPES.values() else dtype
+
+    property_iter = list(property_iterator(class_detail['properties']))
+    superproperty_iter = list(property_iterator(class_detail['superproperties']))
+
+    # Class __init__
+    TEXT = f''' 
+class {class_name}({class_detail['super']}):
+    """{class_detail['comments']}"""'''
+
+    # Properties linking to other resources, followed by DocumentCIMRDF.add_recursively
+    references = [prop_name for prop_name, dtype, inverseRoleName, minBound, maxBound, comments in superproperty_iter if dtype not in __DATATYPES.values() and dtype not in enumerations]
+    TEXT += f'''
+    _references = {tuple(references)!r}'''
+
+    # Storage of the class' own properties (name-mangled like the attributes in the code below)
+    if slots:
+        storage = ([] if class_detail['super'] else ['URI', '_validated']) + [f'__{prop_name}' for prop_name, *_ in property_iter]
+        TEXT += f'''
+    __slots__ = {tuple(storage)!r}'''
+    TEXT += f'''
+    def __init__(self'''
+
+    # Constructor attributes
+    for prop_name, dtype, inverseRoleName, minBound, maxBound, comments in superproperty_iter:
+        if maxBound < 2:
+            TEXT += f''', {prop_name}: {dtype if dtype in __DATATYPES.values() else f"'{dtype}'"} = None'''
+        elif maxBound >= 2:
+            TEXT += f''', {prop_name}: List[{dtype if dtype in __DATATYPES.values() else f"'{dtype}'"}] = None'''
+    TEXT += ', URI: str = None):'
+
+    # Super class
+    if class_detail['super']:
+        TEXT += f'''
+        super().__init__('''
+
+        # Super call attributes
+        TEXT += ''.join(f'{prop_name}={prop_name}, ' for prop_name, dtype, inverseRoleName, minBound, maxBound, comments in property_iterator(classes[class_detail['super']]['superproperties']))
+        TEXT += 'URI=URI)'
+
+    # URI generate URI
+    if not class_detail['super']:
+        TEXT += f'''
+        self.URI = '#' + str(uuid()) if URI is None else URI
+        self._validated = False'''
+
+    # List instance attributes
+    for prop_name, dtype, inverseRoleName, minBound, maxBound, comments in property_iter:
+
+        TEXT += f'''
+        # {comments} ''' if comments else ''
+        TEXT += f'''
+        self.{prop_name} = {prop_name}'''
+
+    # Define Properties
+    for prop_name, dtype, inverseRoleName, minBound, maxBound, comments in property_iter:
+
+        # For non list properties
+        if maxBound < 2:
+            TEXT += f'''
+    @property
+    def {prop_name}(self) -> {dtype if dtype in __DATATYPES.values() else f"'{dtype}'"}:
+        return self.__{prop_name}
+    @{prop_name}.setter
+    def {prop_name}(self, value: {dtype if dtype in __DATATYPES.values() else f"'{dtype}'"}):
+        self._validated = False
+        if value == None:
+            self.__{prop_name} = None
+        elif not hasattr(self, '{prop_name}') or self.{prop_name} is not value:'''
+
+            # Boolean type
+            if dtype == 'bool':
+                TEXT += f'''
+            self.__{prop_name} = str(value).lower() == 'true' '''
+            # Other primitives
+            elif dtype in __DATATYPES.values():
+                TEXT += f'''
+            self.__{prop_name} = {dtype}(value)'''
+            # Enumerations
+            elif dtype in enumerations:
+                TEXT += f'''
+            self.__{prop_name} = {ref(dtype)}(value)'''
+            # Complex values
+            else:
+                TEXT += f'''
+            self.__{prop_name} = value'''
+            
+            # Set inverse attribute if it exists
+            if inverseRoleName:
+                TEXT += f'''
+            if isinstance(value.{inverseRoleName}, list):
+                value.add_{inverseRoleName}(self)
+            else:
+                value.{inverseRoleName} = self'''
+
+        # For lists
+        elif maxBound >= 2:
+            # Boolean type
+            if dtype == 'bool':
+                converted = "str(value).lower() == 'true'"
+            # Other primitives
+            elif dtype in __DATATYPES.values():
+                converted = f'{dtype}(value)'
+            # Enumerations
+            elif dtype in enumerations:
+                converted = f'{ref(dtype)}(value)'
+            # Complex values
+            else:
+                converted = 'value'
+
+            TEXT += f'''
+    def add_{prop_name}(self, value: {dtype if dtype in __DATATYPES.values() else f"'{dtype}'"}):
+        self._validated = False
+        if not hasattr(self, '{prop_name}'):
+            self.__{prop_name} = _UniqueList(owner=self)'''
+
+            # Set inverse attribute if it exists
+            if inverseRoleName:
+                TEXT += f'''
+        if self.__{prop_name}.add({converted}):
+            if isinstance(value.{inverseRoleName}, list):
+                value.add_{inverseRoleName}(self)
+            else:
+                value.{inverseRoleName} = self'''
+            else:
+                TEXT += f'''
+        self.__{prop_name}.add({converted})'''
+
+            TEXT += f'''
+    def add_many_{prop_name}(self, values: List[{dtype if dtype in __DATATYPES.values() else f"'{dtype}'"}]):
+        for value in values:
+            self.add_{prop_name}(value)
+    @property
+    def {prop_name}(self) -> List[{dtype if dtype in __DATATYPES.values() else f"'{dtype}'"}]:
+        return self.__{prop_name}
+    @{prop_name}.setter
+    def {prop_name}(self, list_objs: List[{dtype if dtype in __DATATYPES.values() else f"'{dtype}'"}]):
+        if list_objs == None:
+            self._validated = False
+            self.__{prop_name} = _UniqueList(owner=self)
+            return
+        self.add_many_{prop_name}(list_objs)'''
+
+    # Properties of the class and its superclasses, from the root class down, with the class defining each one
+    lineage = [class_name]
+    while classes[lineage[-1]]['super']:
+        lineage.append(classes[lineage[-1]]['super'])
+    lineage_properties = [(owner, prop) for owner in reversed(lineage) for prop in property_iterator(classes[owner]['properties'])]
+
+    # SERIALIZATION #####################################################################
+
+    if not class_detail['super']:
+        TEXT += f'''
+    def serialize(self, validate = True, etree = ET) -> ET.Element:
+        """RDF/XML element of the resource, built with `etree` (an implementation of the ElementTree API).
+        It is validated first, unless `validate` is False or it has not changed since its last
+        successful validation.
+        """
+        if validate:
+            self._validate_once()
+        return self._serialize(etree)
+    def _validate_once(self):
+        """`validate`, unless the resource has not changed since its last successful validation."""
+        if not self._validated:
+            self.validate()
+            self._validated = True'''
+    # Flattened over the class hierarchy: inherited properties are read from their name-mangled
+    # storage and every tag is a string constant, so no superclass method is called
+    TEXT += f'''
+    def _serialize(self, etree) -> ET.Element:
+        SubElement = etree.SubElement
+        root = etree.Element('{'{'+base_ns+'}'}{class_name}', attrib={"{'{"+__RDF_NS+"}about': self.URI}"})'''
+
+    for owner, (prop_name, dtype, inverseRoleName, minBound, maxBound, comments) in lineage_properties:
+        tag = '{' + base_ns + '}' + f'{owner}.{prop_name}'
+        value = 'value' if maxBound < 2 else 'item'
+
+        if dtype == 'bool': # If it is a boolean value
+            element = f"SubElement(root, '{tag}').text = str({value}).lower()"
+        elif dtype in __DATATYPES.values(): # If it is another primitive
+            element = f"SubElement(root, '{tag}').text = str({value})"
+        elif dtype in enumerations: # If it is an enumeration
+            element = f"SubElement(root, '{tag}').text = {value}.value"
+        else: # if it is a complex type
+            element = f"SubElement(root, '{tag}', {{'{{{__RDF_NS}}}resource': {value}.URI}})"
+
+        if maxBound < 2:  # If it is a unique object
+            TEXT += f'''
+        value = self._{owner}__{prop_name}
+        if value is not None:
+            {element}'''
+        else:  # If it is a list of objects
+            TEXT += f'''
+        for item in self._{owner}__{prop_name}:
+            {element}'''
+    TEXT += '''
+        return root'''
+
+
+    # VALIDATION
+
+    if not class_detail['super']:
+        TEXT += '''
+    def validate(self):
+        """Raise a ValueError for the first property breaking its multiplicity or datatype."""
+        for prop_name, message in self._check():
+            raise ValueError(message)'''
+    # Flattened over the class hierarchy as well
+    TEXT += '''
+    def _check(self):
+        """Yield a (property name, message) pair for every property breaking its multiplicity or datatype."""'''
+
+    for owner, (prop_name, dtype, inverseRoleName, minBound, maxBound, comments) in lineage_properties:
+
+        if maxBound < 2:
+            #>>>>>>>>>>>>>>>>>>>>>>
+            TEXT += f'''
+        value = self._{owner}__{prop_name}
+        if not isinstance(value, {ref(dtype)}){' and value is not None' if minBound == 0 else ''}:
+            yield ('{prop_name}', f'Incorrect datatype in {prop_name} [{owner}] (expected {dtype} but encountered {{value.__class__.__name__}} instead)')'''
+            #<<<<<<<<<<<<<<<<<<<<<<
+        else:
+            #>>>>>>>>>>>>>>>>>>>>>>
+            values = f'self._{owner}__{prop_name}'
+            # Unbounded lists without a lower bound always have a valid multiplicity
+            if minBound > 0 or maxBound != float('Inf'):
+                TEXT += f'''
+        values = {values}
+        if not {minBound} <= len(values){f' <= {maxBound}' if maxBound != float('Inf') else ''}:
+            yield ('{prop_name}', 'Incorrect multiplicity in {prop_name} [{owner}]')'''
+                values = 'values'
+            TEXT += f'''
+        for item in {values}:
+            if not isinstance(item, {ref(dtype)}):
+                yield '{prop_name}', f'Incorrect datatype in {prop_name} [{owner}] (expected {dtype} but encountered {{item.__class__.__name__}} instead)'
+                break'''
+            #<<<<<<<<<<<<<<<<<<<<<<
+
+    # If no property, it yields nothing
+    if not lineage_properties:
+        TEXT += '''
+        yield from ()'''
+    TEXT += '\n'
+
+    # Setters by property tag (including inherited properties), used by `_import`
+    TEXT += f'''{class_name}._setters = {{'''
+    for prop_id, (prop_name, dtype, inverseRoleName, minBound, maxBound, comments) in zip(class_detail['superproperties'], superproperty_iter):
+        TEXT += f'''
+    '{prop_id}': {class_name}.{f'add_{prop_name}' if maxBound >= 2 else f'{prop_name}.fset'},'''
+    TEXT += '\n}\n' if superproperty_iter else '}\n'
+
+    # Storage attribute, kind, value type, tag and storage attribute of the inverse property of every
+    # property (including inherited properties), used by snapshots and difference models
+    TEXT += f'''{class_name}._fields = ('''
+    for owner, (prop_name, dtype, inverseRoleName, minBound, maxBound, comments) in lineage_properties:
+        inverse = None
+        if dtype in __DATATYPES.values() or dtype in enumerations:
+            kind, value_type = ('values' if maxBound >= 2 else 'value'), ref(dtype)
+        else:
+            kind, value_type = ('refs' if maxBound >= 2 else 'ref'), None
+            if inverseRoleName:
+                inverse_owner, inverse_name = class_detail['superproperties'][f'{owner}.{prop_name}']['inverseRoleName'].split('.')
+                inverse = f"'_{inverse_owner}__{inverse_name}'"
+        TEXT += f'''
+    ('_{owner}__{prop_name}', '{kind}', {value_type}, '{owner}.{prop_name}', {inverse}),'''
+    TEXT += '\n)\n' if lineage_properties else ')\n'
+    return TEXT
+
+
+def emit_dispatch_table(classes):
+    """Resource classes by name, used by `_import` to instantiate parsed resources."""
+    TEXT = '''
+_CLASSES = {
+    '''
+    TEXT += ',\n    '.join(f"'{e}': {e}" for e in sorted(classes))
+    TEXT += '''
+}
+'''
+    return TEXT
+
+
+def emit_footer(enumerations, classes):
+    TEXT = '''
+__all__ = [
+    'DocumentCIMRDF',
+    'Instrumentation',
+    'Violation',
+    '''
+    TEXT += ',\n    '.join(f"'{e}'" for e in sorted(chain(enumerations, classes)))
+    TEXT += '\n]'
+    TEXT += '\n'
+    return TEXT
+
+
+def emit_package_init(enumerations, classes):
+    """`__init__` of a generated package: every name is imported from its own submodule on first access."""
+    TEXT = '''from importlib import import_module
+
+_MODULES = {
+    'DocumentCIMRDF': '_base',
+    'Instrumentation': '_base',
+    'Violation': '_base',
+    '''
+    TEXT += ',\n    '.join(f"'{e}': '_{e}'" for e in sorted(chain(enumerations, classes)))
+    TEXT += '''
+}
+
+def __getattr__(name):
+    if name not in _MODULES:
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+    value = getattr(import_module('.' + _MODULES[name], __name__), name)
+    globals()[name] = value
+    return value
+
+def __dir__():
+    return sorted(set(globals()) | set(_MODULES))
+'''
+    TEXT += emit_footer(enumerations, classes)
+    return TEXT
+
+
+def emit_submodule_header(superclass=''):
+    """Imports of a package submodule holding a single enumeration or class."""
+    TEXT = '''import sys
+from decimal import Decimal
+from enum import Enum
+from typing import List
+from uuid import uuid4 as uuid
+from xml.etree import ElementTree as ET
+
+from ._base import _UniqueList
+'''
+    if superclass:
+        TEXT += f'''
+from ._{superclass} import {superclass}'''
+    TEXT += '''
+_pkg = sys.modules[__package__]
+'''
+    return TEXT
+
+
+#################################
+
+def generator_version():
+    """Version stamp of the generator: release number and a digest of this module's source."""
+    try:
+        with open(__file__, 'rb') as file:
+            source_digest = hashlib.sha256(file.read()).hexdigest()[:16]
+    except OSError:
+        source_digest = ''
+    return f'{__version__}+{source_digest}'
+
+def _digest(*parts):
+    return hashlib.sha256(json.dumps(parts).encode()).hexdigest()
+
+def schema_digest(base_ns, enumerations, classes):
+    """Digest of a schema and of the generator, with which generated modules stamp their snapshots."""
+    return _digest(generator_version(), base_ns, enumerations, classes)
+
+def _file_digest(filename):
+    digest = hashlib.sha256()
+    with open(filename, 'rb') as file:
+        for block in iter(lambda: file.read(1 << 16), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def _write_atomic(filename, text):
+    temporary = f'{filename}.{os.getpid()}.tmp'
+    with open(temporary, 'w') as file:
+        file.write(text)
+    os.replace(temporary, filename)
+
+
+class ChunkCache():
+    """Generated code of enumerations and classes, stored in `directory` by the digest of their schema entries.
+
+    The names of the entries found in the cache and of the ones emitted again
+    are collected in `reused` and `regenerated`.
+    """
+    def __init__(self, directory, version):
+        self.directory = directory
+        self.version = version
+        self.reused = []
+        self.regenerated = []
+        os.makedirs(directory, exist_ok=True)
+
+    def fetch(self, name, key_parts, emit):
+        filename = os.path.join(self.directory, _digest(self.version, *key_parts) + '.py')
+        if os.path.isfile(filename):
+            self.reused.append(name)
+            with open(filename) as file:
+                return file.read()
+        self.regenerated.append(name)
+        text = emit()
+        _write_atomic(filename, text)
+        return text
+
+
+def iter_module(enumerations, classes, base_ns, cache=None, slots=False):
+    """Yield the code of the generated module in chunks: the header, one chunk per
+    enumeration and per class (superclasses first), and the footer.
+
+    Chunks are emitted only when requested, so the caller can write them out
+    one at a time. A `ChunkCache` may be given to reuse previously emitted chunks.
+    With `slots`, classes store their properties in `__slots__` instead of an instance `__dict__`.
+    """
+    def fetch(name, key_parts, emit, *args, **kwargs):
+        if cache is None:
+            return emit(*args, **kwargs)
+        return cache.fetch(name, key_parts, lambda: emit(*args, **kwargs))
+
+    yield emit_header(base_ns, schema_hash=schema_digest(base_ns, enumerations, classes))
+
+    for enum in enumerations:
+        yield fetch(enum, (enum, enumerations[enum]), emit_enumeration, enum, enumerations[enum])
+
+    for class_name in sort_classes(classes):
+        class_detail = classes[class_name]
+        used_enumerations = sorted(set(prop['type'] for prop in class_detail['superproperties'].values() if prop['type'] in enumerations))
+        key_parts = (base_ns, class_name, class_detail, used_enumerations, slots)
+        yield fetch(class_name, key_parts, emit_class, class_name, classes, enumerations, base_ns, slots=slots)
+
+    yield emit_dispatch_table(classes)
+    yield emit_footer(enumerations, classes)
+
+
+def iter_package(enumerations, classes, base_ns, cache=None, slots=False):
+    """Yield the files of the generated package as (file name, code) pairs: the `__init__`,
+    `_base` (with `DocumentCIMRDF`) and one submodule per enumeration and per class.
+    """
+    def fetch(name, key_parts, emit, *args, **kwargs):
+        if cache is None:
+            return emit(*args, **kwargs)
+        return cache.fetch(name, ('package',) + key_parts, lambda: emit(*args, **kwargs))
+
+    yield '__init__.py', emit_package_init(enumerations, classes)
+    yield '_base.py', emit_header(base_ns, package=True, schema_hash=schema_digest(base_ns, enumerations, classes)) + "\n__all__ = ['DocumentCIMRDF', 'Instrumentation', 'Violation']\n"
+
+    for enum in enumerations:
+        yield f'_{enum}.py', emit_submodule_header() + fetch(enum, (enum, enumerations[enum]), emit_enumeration, enum, enumerations[enum])
+
+    for class_name in sort_classes(classes):
+        class_detail = classes[class_name]
+        used_enumerations = sorted(set(prop['type'] for prop in class_detail['superproperties'].values() if prop['type'] in enumerations))
+        key_parts = (base_ns, class_name, class_detail, used_enumerations, slots)
+        code = fetch(class_name, key_parts, emit_class, class_name, classes, enumerations, base_ns, package=True, slots=slots)
+        yield f'_{class_name}.py', emit_submodule_header(class_detail['super']) + code
+
+
+def write_chunks(chunks, *files):
+    """Write every chunk to all `files` as soon as it is produced."""
+    for chunk in chunks:
+        for file in files:
+            file.write(chunk)
+
+
+def load_schema(input_file):
+    """Parse the RDFS `input_file` into its base namespace, enumerations and classes."""
+    xmldoc = ElementTree.parse(input_file)
+    root = xmldoc.getroot()
+    __BASE_NS = root.attrib[__XML_BASE].replace('#', '') + '#'
+
+    enumerations, classes = parse_schema(root)
+    return __BASE_NS, enumerations, classes
+
+
+def generate(input_file, output, cache_dir=None, slots=False):
+    """Generate the Python module for the RDFS `input_file` into `output`, a file name or a text file object.
+
+    The module is streamed to `output` one enumeration or class at a time. A file name is written
+    through a temporary file that replaces it once the whole module is generated, so a schema error
+    leaves any previous module in place.
+    With `slots`, the generated classes use `__slots__`, which saves memory for large models.
+    With a `cache_dir`, the generated module is stored under a key made of the input file digest
+    and the generator version, and copied as is while neither changes. The code of every enumeration
+    and class is also cached by the digest of its own schema entries, so when the profile changes
+    only the entries that changed are emitted again.
+    Returns a dict with the sorted 'reused' and 'regenerated' enumeration and class names.
+    """
+    if isinstance(output, (str, os.PathLike)):
+        temporary = f'{output}.{os.getpid()}.tmp'
+        try:
+            with open(temporary, 'w') as file:
+                report = generate(input_file, file, cache_dir, slots)
+            os.replace(temporary, output)
+        finally:
+            if os.path.exists(temporary):
+                os.remove(temporary)
+        return report
+
+    version = generator_version()
+
+    if cache_dir is not None:
+        module_cache = os.path.join(cache_dir, _digest(version, _file_digest(input_file), slots) + '.py')
+        if os.path.isfile(module_cache) and os.path.isfile(module_cache + '.json'):
+            with open(module_cache + '.json') as file:
+                names = json.load(file)
+            with open(module_cache) as file:
+                shutil.copyfileobj(file, output)
+            return {'reused': names, 'regenerated': []}
+
+    base_ns, enumerations, classes = load_schema(input_file)
+
+    if cache_dir is None:
+        write_chunks(iter_module(enumerations, classes, base_ns, slots=slots), output)
+        return {'reused': [], 'regenerated': []}
+
+    cache = ChunkCache(os.path.join(cache_dir, 'chunks'), version)
+    temporary = f'{module_cache}.{os.getpid()}.tmp'
+    with open(temporary, 'w') as file:
+        write_chunks(iter_module(enumerations, classes, base_ns, cache, slots), output, file)
+    os.replace(temporary, module_cache)
+    _write_atomic(module_cache + '.json', json.dumps(sorted(chain(enumerations, classes))))
+    return {'reused': sorted(cache.reused), 'regenerated': sorted(cache.regenerated)}
+
+
+def _copy_files(source_dir, target_dir):
+    os.makedirs(target_dir, exist_ok=True)
+    for filename in os.listdir(source_dir):
+        shutil.copyfile(os.path.join(source_dir, filename), os.path.join(target_dir, filename))
+
+
+def _replace_directory(temporary, directory):
+    if os.path.isdir(directory):
+        previous = f'{directory}.{os.getpid()}.old'
+        os.replace(directory, previous)
+        os.replace(temporary, directory)
+        shutil.rmtree(previous)
+    else:
+        os.replace(temporary, directory)
+
+
+def generate_package(input_file, directory, cache_dir=None, slots=False):
+    """Generate a Python package for the RDFS `input_file` into `directory`, with one submodule
+    per enumeration and per class, imported lazily on first access.
+
+    Caching and `slots` work as in `generate`. Each file is written as soon as it is generated, into a
+    temporary directory that replaces `directory` once the whole package is generated.
+    Returns a dict with the sorted 'reused' and 'regenerated' enumeration and class names.
+    """
+    version = generator_version()
+    directory = os.path.normpath(directory)
+    temporary = f'{directory}.{os.getpid()}.tmp'
+
+    if cache_dir is not None:
+        package_cache = os.path.join(cache_dir, _digest(version, 'package', _file_digest(input_file), slots))
+        if os.path.isdir(package_cache) and os.path.isfile(package_cache + '.json'):
+            with open(package_cache + '.json') as file:
+                names = json.load(file)
+            try:
+                _copy_files(package_cache, temporary)
+                _replace_directory(temporary, directory)
+            finally:
+                if os.path.isdir(temporary):
+                    shutil.rmtree(temporary)
+            return {'reused': names, 'regenerated': []}
+
+    base_ns, enumerations, classes = load_schema(input_file)
+
+    cache = ChunkCache(os.path.join(cache_dir, 'chunks'), version) if cache_dir is not None else None
+    try:
+        os.makedirs(temporary)
+        for filename, code in iter_package(enumerations, classes, base_ns, cache, slots):
+            with open(os.path.join(temporary, filename), 'w') as file:
+                file.write(code)
+        _replace_directory(temporary, directory)
+    finally:
+        if os.path.isdir(temporary):
+            shutil.rmtree(temporary)
+
+    if cache is None:
+        return {'reused': [], 'regenerated': []}
+
+    temporary = f'{package_cache}.{os.getpid()}.tmp'
+    _copy_files(directory, temporary)
+    _replace_directory(temporary, package_cache)
+    _write_atomic(package_cache + '.json', json.dumps(sorted(chain(enumerations, classes))))
+    return {'reused': sorted(cache.reused), 'regenerated': sorted(cache.regenerated)}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='cimrdfpy', description='Generate Python data structures from a CIM RDF schema (RDFS) file.')
+    parser.add_argument('input_file', help='RDFS profile (XML)')
+    parser.add_argument('output_file', help='Python module (or package directory, with --package) to be generated')
+    parser.add_argument('--cache-dir', help='directory where generated code is cached, so unchanged profiles and classes are not generated again')
+    parser.add_argument('--package', action='store_true', help='generate a package directory with one lazily imported submodule per class instead of a single module')
+    parser.add_argument('--slots', action='store_true', help='store the properties of generated classes in __slots__, using less memory per instance')
+    args = parser.parse_args(argv)
+
+    if args.package:
+        report = generate_package(args.input_file, args.output_file, args.cache_dir, args.slots)
+    else:
+        report = generate(args.input_file, args.output_file, args.cache_dir, args.slots)
+
+    if args.cache_dir is not None:
+        print(f"Reused ({len(report['reused'])}): {', '.join(report['reused'])}")
+        print(f"Regenerated ({len(report['regenerated'])}): {', '.join(report['regenerated'])}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+"""Topology processing over the classes of a generated module.
+
+`TopologyProcessor` collapses the connectivity nodes joined by closed switches into buses, and the
+buses connected by conducting equipment into islands. Resources are recognized by the names of their
+classes and superclasses (`Terminal`, `ConnectivityNode` and `Switch`, which includes breakers,
+disconnectors, fuses, etc.), so any module generated from a CIM profile can be used.
+"""
+from functools import lru_cache
+
+
+@lru_cache(maxsize=None)
+def _inherits(cls, class_name):
+    return any(base.__name__ == class_name for base in cls.__mro__)
+
+
+def _is_a(resource, class_name):
+    return _inherits(type(resource), class_name)
+
+
+class _DisjointSets():
+    """Array-backed union-find over the integers 0..n-1.
+
+    The members of every set are kept along with its root, so a set can be split again into
+    singletons and rebuilt from the edges that are still active.
+    """
+    def __init__(self, n):
+        self.parent = list(range(n))
+        self.members = [[i] for i in range(n)]
+
+    def find(self, i):
+        parent = self.parent
+        while parent[i] != i:
+            # Path halving
+            parent[i] = i = parent[parent[i]]
+        return i
+
+    def union(self, a, b):
+        a, b = self.find(a), self.find(b)
+        if a == b:
+            return
+        # Union by size: the smaller set is appended to the larger one
+        if len(self.members[a]) < len(self.members[b]):
+            a, b = b, a
+        self.parent[b] = a
+        self.members[a] += self.members[b]
+        self.members[b] = None
+
+    def split(self, root):
+        """Turn every member of the set of `root` into a singleton. Returns the former members."""
+        members = self.members[root]
+        for i in members:
+            self.parent[i] = i
+            self.members[i] = [i]
+        return members
+
+    def roots(self):
+        return (i for i, parent in enumerate(self.parent) if parent == i)
+
+
+class TopologyProcessor():
+    """Buses and islands of the connectivity nodes found in `resources` (e.g. `document.resources`).
+
+    A switch is open if its `open` property says so or, when it is None (or with `normal=True`), if its
+    `normalOpen` property does. Connectivity nodes joined by closed switches form a bus; buses joined by
+    closed switches or by any other conducting equipment form an island.
+
+    After the state of a switch changes, `set_switch` (or `update`, if the property was set directly)
+    re-evaluates only the bus and island of that switch.
+    """
+    def __init__(self, resources, normal = False):
+        self.normal = normal
+        self.nodes = []
+        node_index = {}
+        equipment_nodes = {}
+        for resource in resources:
+            if _is_a(resource, 'ConnectivityNode') and id(resource) not in node_index:
+                node_index[id(resource)] = len(self.nodes)
+                self.nodes.append(resource)
+        for resource in resources:
+            if not _is_a(resource, 'Terminal') or resource.ConnectivityNode is None or resource.ConductingEquipment is None:
+                continue
+            node = node_index.get(id(resource.ConnectivityNode))
+            if node is None:
+                node = node_index[id(resource.ConnectivityNode)] = len(self.nodes)
+                self.nodes.append(resource.ConnectivityNode)
+            equipment, nodes = equipment_nodes.setdefault(id(resource.ConductingEquipment), (resource.ConductingEquipment, []))
+            if node not in nodes:
+                nodes.append(node)
+        self.__node_index = node_index
+
+        # Edges between the first node of each piece of equipment and its other nodes
+        self.__edges = []
+        self.__edges_at = [[] for _ in self.nodes]
+        self.__switches = {}
+        self.__open = []
+        self.__switch_edges = []
+        for equipment, nodes in equipment_nodes.values():
+            switch = None
+            if _is_a(equipment, 'Switch'):
+                switch = self.__switches[id(equipment)] = len(self.__open)
+                self.__open.append(self.is_open(equipment))
+                self.__switch_edges.append([(nodes[0], node, switch) for node in nodes[1:]])
+            for node in nodes[1:]:
+                self.__edges_at[nodes[0]].append(len(self.__edges))
+                self.__edges_at[node].append(len(self.__edges))
+                self.__edges.append((nodes[0], node, switch))
+
+        self.__buses = _DisjointSets(len(self.nodes))
+        self.__islands = _DisjointSets(len(self.nodes))
+        for a, b, switch in self.__edges:
+            if switch is None:
+                self.__islands.union(a, b)
+            elif not self.__open[switch]:
+                self.__buses.union(a, b)
+                self.__islands.union(a, b)
+
+    def is_open(self, switch):
+        """Whether `switch` is open, from its `open` property or, if None (or with `normal`), its `normalOpen`."""
+        state = None if self.normal else switch.open
+        return bool(switch.normalOpen if state is None else state)
+
+    def set_switch(self, switch, open):
+        """Open or close `switch` (its `normalOpen` property with `normal`, `open` otherwise) and update the
+        bus and island it belongs to."""
+        if self.normal:
+            switch.normalOpen = open
+        else:
+            switch.open = open
+        self.update(switch)
+
+    def update(self, switch):
+        """Re-evaluate the bus and island of `switch` after its state changed. Closing a switch merges two
+        sets; opening it rebuilds the bus and island it belonged to from their remaining closed edges."""
+        index = self.__switches[id(switch)]
+        is_open = self.is_open(switch)
+        if is_open == self.__open[index]:
+            return
+        self.__open[index] = is_open
+        edges = self.__switch_edges[index]
+        if not is_open:
+            for a, b, _ in edges:
+                self.__buses.union(a, b)
+                self.__islands.union(a, b)
+            return
+        for sets, through_equipment in ((self.__buses, False), (self.__islands, True)):
+            for root in {sets.find(a) for a, b, _ in edges}:
+                for node in sets.split(root):
+                    for edge in self.__edges_at[node]:
+                        a, b, other = self.__edges[edge]
+                        if through_equipment if other is None else not self.__open[other]:
+                            sets.union(a, b)
+
+    def bus(self, node):
+        """Connectivity nodes in the same bus as `node`."""
+        sets = self.__buses
+        return [self.nodes[i] for i in sets.members[sets.find(self.__node_index[id(node)])]]
+
+    def island(self, node):
+        """Connectivity nodes in the same island as `node`."""
+        sets = self.__islands
+        return [self.nodes[i] for i in sets.members[sets.find(self.__node_index[id(node)])]]
+
+    def buses(self):
+        """Connectivity nodes of every bus."""
+        return [[self.nodes[i] for i in self.__buses.members[root]] for root in self.__buses.roots()]
+
+    def islands(self):
+        """Connectivity nodes of every island."""
+        return [[self.nodes[i] for i in self.__islands.members[root]] for root in self.__islands.roots()]
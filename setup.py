@@ -21,6 +21,10 @@ setup(
         ]
     },
     packages=['cimrdfpy'],
+    extras_require={
+        'lxml': ['lxml'],
+        'numpy': ['numpy'],
+    },
     classifiers=[
         "Programming Language :: Python :: 3",
         "License :: OSI Approved :: MIT License",
@@ -1,6 +1,7 @@
 import builtins
 import io
 import os
+import subprocess
 import sys
 
 import pytest
@@ -42,6 +43,39 @@ def delete_generated_files(monkeypatch):
         os.remove(file)
 
 
+@pytest.fixture(scope='module')
+def slots_module(tmp_path_factory):
+    """The test schema generated with --slots, importable as `slots_output`."""
+    import importlib.util
+
+    path = str(tmp_path_factory.mktemp('slots') / 'slots_output.py')
+    with patch.object(sys, 'argv', ['', './tests/test_rdfs.xml', path, '--slots']):
+        generator.main()
+    spec = importlib.util.spec_from_file_location('slots_output', path)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules['slots_output'] = module
+    try:
+        spec.loader.exec_module(module)
+        yield module
+    finally:
+        del sys.modules['slots_output']
+
+
+def _network(module, n, uris=False, **switch):
+    """`n` switches of the generated `module`, each with a terminal on its own connectivity node, listed
+    as switch, node, terminal. With `uris`, they are identified as '#_SW<i>', '#_CN<i>' and '#_T<i>'.
+    """
+    resources = []
+    for i in range(n):
+        s = module.Switch(mRID=f'SW{i}', **switch)
+        cn = module.ConnectivityNode(mRID=f'CN{i}')
+        t = module.Terminal(sequenceNumber=1, ConductingEquipment=s, ConnectivityNode=cn)
+        if uris:
+            s.URI, cn.URI, t.URI = f'#_SW{i}', f'#_CN{i}', f'#_T{i}'
+        resources += [s, cn, t]
+    return resources
+
+
 def test_output_generation():
     with patch.object(sys, 'argv', ['', './tests/test_rdfs.xml', './tests/output.py']):
         generator.main()
@@ -212,6 +246,915 @@ def test_read_from_file():
 
     d.dump()
 
+def _synthetic_schema(n_classes, n_properties=5, chained=True):
+    """Build an in-memory RDFS root with `n_classes` classes of `n_properties` each.
+
+    If `chained`, every class is a subclass of the previous one.
+    """
+    from xml.etree import ElementTree as ET
+    RDF = 'http://www.w3.org/1999/02/22-rdf-syntax-ns#'
+    RDFS = 'http://www.w3.org/2000/01/rdf-schema#'
+    CIMS = 'http://iec.ch/TC57/1999/rdf-schema-extensions-19990926#'
+    UML = 'http://langdale.com.au/2005/UML#'
+
+    def description(parent, about, rdf_type, label):
+        element = ET.SubElement(parent, '{%s}Description' % RDF, {'{%s}about' % RDF: '#' + about})
+        ET.SubElement(element, '{%s}type' % RDF, {'{%s}resource' % RDF: rdf_type})
+        ET.SubElement(element, '{%s}label' % RDFS).text = label
+        return element
+
+    root = ET.Element('{%s}RDF' % RDF, {'{http://www.w3.org/XML/1998/namespace}base': 'synthetic'})
+    kind = description(root, 'Kind', RDFS + 'Class', 'Kind')
+    ET.SubElement(kind, '{%s}stereotype' % CIMS, {'{%s}resource' % RDF: UML + 'enumeration'})
+    for value in ('a', 'b', 'c'):
+        description(root, 'Kind.' + value, '#Kind', value)
+    for i in range(n_classes):
+        element = description(root, f'Class{i}', RDFS + 'Class', f'Class{i}')
+        if chained and i:
+            ET.SubElement(element, '{%s}subClassOf' % RDFS, {'{%s}resource' % RDF: f'#Class{i - 1}'})
+        for j in range(n_properties):
+            prop = description(root, f'Class{i}.p{j}', RDF + 'Property', f'p{j}')
+            ET.SubElement(prop, '{%s}domain' % RDFS, {'{%s}resource' % RDF: f'#Class{i}'})
+            ET.SubElement(prop, '{%s}range' % RDFS, {'{%s}resource' % RDF: '#Kind'})
+    return root
+
+
+def test_schema_index():
+    root = _synthetic_schema(3, 2)
+    index = generator.index_schema(root)
+    assert [generator.get_resource_id(p) for p in index['properties_by_domain']['Class1']] == ['Class1.p0', 'Class1.p1']
+    assert [generator.get_resource_label(e) for e in index['resources_by_type']['Kind']] == ['a', 'b', 'c']
+    assert generator.get_resource_label(index['elements_by_id']['Class2']) == 'Class2'
+
+    enumerations, classes = generator.parse_schema(root)
+    assert list(enumerations['Kind']['set']) == ['a', 'b', 'c']
+    assert list(classes['Class2']['superproperties']) == ['Class2.p0', 'Class2.p1', 'Class1.p0', 'Class1.p1', 'Class0.p0', 'Class0.p1']
+
+
+def test_schema_parsing_scales_linearly():
+    import time
+
+    def cost(n_classes):
+        # Flat hierarchy, so only the schema lookups are measured
+        root = _synthetic_schema(n_classes, chained=False)
+        timings = []
+        for _ in range(3):
+            start = time.perf_counter()
+            generator.parse_schema(root)
+            timings.append(time.perf_counter() - start)
+        return min(timings)
+
+    small, large = cost(500), cost(2000)
+    # A quadratic lookup would take ~16x longer for 4x more classes
+    assert large / small < 8
+
+
+def test_sort_classes():
+    classes = {
+        'Switch': {'super': 'ConductingEquipment'},
+        'IdentifiedObject': {'super': ''},
+        'ConductingEquipment': {'super': 'Equipment'},
+        'Equipment': {'super': 'IdentifiedObject'},
+        'Terminal': {'super': 'IdentifiedObject'},
+    }
+    assert generator.sort_classes(classes) == ['IdentifiedObject', 'Equipment', 'Terminal', 'ConductingEquipment', 'Switch']
+
+    # Long inheritance chains declared in reverse order are sorted in a single pass
+    chain = {f'Class{i}': {'super': f'Class{i - 1}' if i else ''} for i in reversed(range(5000))}
+    assert generator.sort_classes(chain) == [f'Class{i}' for i in range(5000)]
+
+
+def test_sort_classes_rejects_invalid_hierarchies():
+    with pytest.raises(ValueError, match="'Switch' is a subclass of 'ConductingEquipment'"):
+        generator.sort_classes({'Switch': {'super': 'ConductingEquipment'}})
+    with pytest.raises(ValueError, match='Cyclic class hierarchy between A, B'):
+        generator.sort_classes({'Root': {'super': ''}, 'A': {'super': 'B'}, 'B': {'super': 'A'}})
+
+
+def test_cached_generation(tmp_path, capsys):
+    cache_dir = str(tmp_path / 'cache')
+    schema = tmp_path / 'schema.xml'
+    with open('./tests/test_rdfs.xml') as file:
+        original = file.read()
+    schema.write_text(original)
+
+    generator.generate(str(schema), str(tmp_path / 'plain.py'))
+    first = generator.generate(str(schema), str(tmp_path / 'first.py'), cache_dir)
+    assert first['reused'] == [] and 'Switch' in first['regenerated']
+    assert (tmp_path / 'first.py').read_text() == (tmp_path / 'plain.py').read_text()
+
+    # Unchanged profile: the whole module comes from the cache
+    second = generator.generate(str(schema), str(tmp_path / 'second.py'), cache_dir)
+    assert second['regenerated'] == [] and second['reused'] == sorted(first['regenerated'])
+    assert (tmp_path / 'second.py').read_text() == (tmp_path / 'plain.py').read_text()
+
+    # Only the class whose schema entries changed is emitted again
+    schema.write_text(original.replace('tells if the switch is considered open', 'tells if the switch is open'))
+    generator.generate(str(schema), str(tmp_path / 'plain.py'))
+    with patch.object(sys, 'argv', ['', str(schema), str(tmp_path / 'third.py'), '--cache-dir', cache_dir]):
+        generator.main()
+    assert capsys.readouterr().out.splitlines()[1] == 'Regenerated (1): Switch'
+    assert (tmp_path / 'third.py').read_text() == (tmp_path / 'plain.py').read_text()
+
+
+def test_streamed_generation(tmp_path):
+    class Recorder():
+        def __init__(self):
+            self.chunks = []
+        def write(self, chunk):
+            self.chunks.append(chunk)
+
+    recorder = Recorder()
+    generator.generate('./tests/test_rdfs.xml', recorder)
+    generator.generate('./tests/test_rdfs.xml', str(tmp_path / 'output.py'))
+
+    # The module is written piece by piece, never as a whole: after the runtime header (whose size
+    # does not depend on the schema) each chunk is a small part of the module
+    text = ''.join(recorder.chunks)
+    assert text == (tmp_path / 'output.py').read_text()
+    schema = generator.load_schema('./tests/test_rdfs.xml')
+    assert recorder.chunks[0] == generator.emit_header(schema[0], schema_hash=generator.schema_digest(*schema))
+    assert max(map(len, recorder.chunks[1:])) < len(text) / 10
+
+    # A schema error leaves the previously generated module and package in place
+    broken = tmp_path / 'broken.xml'
+    with open('./tests/test_rdfs.xml') as file:
+        broken.write_text(file.read().replace('rdf:resource="#Conductor"', 'rdf:resource="#Missing"', 1))
+    generator.generate_package('./tests/test_rdfs.xml', str(tmp_path / 'package'))
+    package_files = {path.name: path.read_text() for path in (tmp_path / 'package').iterdir()}
+    for generate, output in ((generator.generate, 'output.py'), (generator.generate_package, 'package')):
+        with pytest.raises(ValueError):
+            generate(str(broken), str(tmp_path / output))
+    assert (tmp_path / 'output.py').read_text() == text
+    assert {path.name: path.read_text() for path in (tmp_path / 'package').iterdir()} == package_files
+    assert sorted(path.name for path in tmp_path.iterdir()) == ['broken.xml', 'output.py', 'package']
+
+    # A successful generation replaces the whole package, from the generator or from the cache
+    for cache_dir in (None, str(tmp_path / 'cache'), str(tmp_path / 'cache')):
+        (tmp_path / 'package' / 'stale.py').write_text('')
+        generator.generate_package('./tests/test_rdfs.xml', str(tmp_path / 'package'), cache_dir)
+        assert {path.name: path.read_text() for path in (tmp_path / 'package').iterdir()} == package_files
+    assert sorted(path.name for path in tmp_path.iterdir()) == ['broken.xml', 'cache', 'output.py', 'package']
+
+
+def test_package_generation(tmp_path):
+    with patch.object(sys, 'argv', ['', './tests/test_rdfs.xml', str(tmp_path / 'lazy_cim'), '--package']):
+        generator.main()
+    sys.path.insert(0, str(tmp_path))
+    try:
+        import lazy_cim
+        # Nothing but the package itself is imported up front
+        assert [name for name in sys.modules if name.startswith('lazy_cim')] == ['lazy_cim']
+
+        from lazy_cim import Switch, Terminal, DocumentCIMRDF
+        loaded = {name for name in sys.modules if name.startswith('lazy_cim.')}
+        assert 'lazy_cim._ACLineSegment' not in loaded
+        assert {'lazy_cim._Switch', 'lazy_cim._ConductingEquipment', 'lazy_cim._Terminal', 'lazy_cim._base'} <= loaded
+
+        s = Switch(mRID='SW1', normalOpen=True)
+        t = Terminal(sequenceNumber=1, ConductingEquipment=s)
+        document = DocumentCIMRDF()
+        document.fromstring(DocumentCIMRDF([s, t]).tostring())
+        switch, = [resource for resource in document.resources if isinstance(resource, Switch)]
+        assert switch.mRID == 'SW1' and switch.Terminals[0].sequenceNumber == 1
+
+        assert 'UnitSymbol' in dir(lazy_cim)
+        with pytest.raises(AttributeError):
+            lazy_cim.NotAClass
+
+        # Modules used by parallel validation, load_many and snapshots are imported on first use
+        code = f'import sys; sys.path.insert(0, {str(tmp_path)!r}); from lazy_cim import DocumentCIMRDF; print(sorted(sys.modules))'
+        imported = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True).stdout
+        assert not {'concurrent.futures', 'mmap', 'multiprocessing', 'pickle'} & set(eval(imported))
+    finally:
+        sys.path.remove(str(tmp_path))
+        for name in [name for name in sys.modules if name.startswith('lazy_cim')]:
+            del sys.modules[name]
+
+
+def test_document_resource_index():
+    from tests.output import Terminal, ConnectivityNode, DocumentCIMRDF
+
+    terminals = [Terminal(sequenceNumber=i) for i in range(20000)]
+    document = DocumentCIMRDF(terminals[:10])
+    document.add_elements(terminals)
+    document.add_elements(terminals[::-1])
+    assert len(document.resources) == 20000
+    assert list(document.resources) == terminals
+
+    t = terminals[1234]
+    assert t in document and t.URI in document
+    assert document.get(t.URI) is t
+    assert document.get('#missing') is None
+    assert ConnectivityNode() not in document and '#missing' not in document
+
+    # Resources parsed from XML are indexed by their URI as well
+    nodes = [ConnectivityNode(mRID=f'CN{i}') for i in range(3)]
+    parsed = DocumentCIMRDF()
+    parsed.fromstring(DocumentCIMRDF(nodes).tostring())
+    assert parsed.get(nodes[2].URI).mRID == 'CN2'
+
+
+def test_add_recursively_long_feeder():
+    from tests.output import ACLineSegment, Terminal, ConnectivityNode, DocumentCIMRDF
+
+    # ConnectivityNode -> Terminal -> ACLineSegment -> Terminal -> ConnectivityNode -> ...
+    node = first = ConnectivityNode(mRID='CN0')
+    for i in range(1, 5001):
+        segment = ACLineSegment(mRID=f'L{i}')
+        Terminal(sequenceNumber=1, ConductingEquipment=segment, ConnectivityNode=node)
+        node = ConnectivityNode(mRID=f'CN{i}')
+        Terminal(sequenceNumber=2, ConductingEquipment=segment, ConnectivityNode=node)
+
+    document = DocumentCIMRDF()
+    document.add_recursively(first)
+    assert len(document.resources) == 5001 + 3 * 5000
+    assert document.resources[0] is first and node in document
+
+
+def test_import_forward_references():
+    from tests.output import Terminal, ConnectivityNode, DocumentCIMRDF
+
+    document = DocumentCIMRDF()
+    document.fromstring('''<rdf:RDF xmlns:rdf="http://www.w3.org/1999/02/22-rdf-syntax-ns#" xmlns:cim="http://iec.ch/TC57/CIM100#">
+        <cim:Terminal rdf:ID="T1">
+            <cim:Terminal.ConnectivityNode rdf:resource="#CN1"/>
+            <cim:Terminal.sequenceNumber>1</cim:Terminal.sequenceNumber>
+        </cim:Terminal>
+        <rdf:Description rdf:about="#CN1">
+            <rdf:type rdf:resource="http://iec.ch/TC57/CIM100#ConnectivityNode"/>
+            <cim:IdentifiedObject.mRID>CN1</cim:IdentifiedObject.mRID>
+        </rdf:Description>
+    </rdf:RDF>''')
+
+    t, cn = document.get('#T1'), document.get('#CN1')
+    assert isinstance(t, Terminal) and isinstance(cn, ConnectivityNode)
+    assert t.sequenceNumber == 1 and cn.mRID == 'CN1'
+    assert t.ConnectivityNode is cn and cn.Terminals == [t]
+
+    # A description without rdf:type can only extend a resource typed earlier
+    with pytest.raises(ValueError, match='#CN2'):
+        DocumentCIMRDF().fromstring('''<rdf:RDF xmlns:rdf="http://www.w3.org/1999/02/22-rdf-syntax-ns#" xmlns:cim="http://iec.ch/TC57/CIM100#">
+            <rdf:Description rdf:about="#CN2">
+                <cim:IdentifiedObject.mRID>CN2</cim:IdentifiedObject.mRID>
+            </rdf:Description>
+        </rdf:RDF>''')
+
+
+def test_streaming_fromfile_memory(tmp_path):
+    import tracemalloc
+    from xml.etree import ElementTree as ET
+    from tests import output
+    from tests.output import DocumentCIMRDF, _import
+
+    resources = _network(output, 1000, name='Switch', normalOpen=True, open=False)
+    filename = str(tmp_path / 'network.xml')
+    DocumentCIMRDF(resources).tofile(filename)
+    del resources
+
+    def peak_memory(load):
+        tracemalloc.start()
+        try:
+            load()
+            return tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    document = DocumentCIMRDF()
+    streamed = peak_memory(lambda: document.fromfile(filename))
+    whole_tree = peak_memory(lambda: _import(ET.parse(filename).getroot()))
+
+    # The parsed tree is released resource by resource instead of living next to the instances
+    assert streamed < 0.6 * whole_tree
+    assert len(document.resources) == 3000
+    assert document.resources[0].mRID == 'SW0'
+
+
+def test_streaming_tofile(tmp_path):
+    from tests import output
+    from tests.output import DocumentCIMRDF, _WRITE_BATCH
+
+    class Stream():
+        def __init__(self):
+            self.chunks = []
+        def write(self, data):
+            self.chunks.append(data)
+
+    resources = _network(output, 100, name='Swítch & <co>', normalOpen=True, open=False)
+
+    # pack() always builds its tree with the standard library
+    for document in (DocumentCIMRDF(backend='stdlib'), DocumentCIMRDF(resources, backend='stdlib')):
+        document.pack().write(str(tmp_path / 'packed.xml'))
+        document.tofile(str(tmp_path / 'streamed.xml'))
+        expected = (tmp_path / 'packed.xml').read_bytes()
+        assert (tmp_path / 'streamed.xml').read_bytes() == expected
+        assert document.tostring() == expected
+
+    stream = Stream()
+    document.tofile(stream)
+    assert b''.join(stream.chunks) == expected
+    # The header, one chunk per batch of resources and the footer
+    assert len(stream.chunks) == -(-len(resources) // _WRITE_BATCH) + 2
+
+
+def test_slots_generation(slots_module):
+    import tracemalloc
+    from tests import output
+
+    slots_output = slots_module
+
+    s = slots_output.Switch(mRID='SW1', normalOpen=True)
+    t = slots_output.Terminal(sequenceNumber=1, ConductingEquipment=s)
+    assert not hasattr(s, '__dict__') and not hasattr(t, '__dict__')
+    with pytest.raises(AttributeError):
+        s.unknown = 1
+
+    document = slots_output.DocumentCIMRDF()
+    document.add_recursively(t)
+    assert set(document.resources) == {s, t}
+    parsed = slots_output.DocumentCIMRDF()
+    parsed.fromstring(document.tostring())
+    assert parsed.get(s.URI).Terminals[0].sequenceNumber == 1
+
+    def memory(module):
+        tracemalloc.start()
+        terminals = [module.Terminal(sequenceNumber=i) for i in range(2000)]
+        size = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        return size
+
+    assert memory(slots_output) < memory(output)
+
+
+def test_multi_valued_properties():
+    import pickle
+    import tracemalloc
+    from tests.output import Terminal, ConnectivityNode, _UniqueList
+
+    terminals = [Terminal(sequenceNumber=i) for i in range(50000)]
+    cn = ConnectivityNode(mRID='CN')
+    cn.add_many_Terminals(terminals)
+    cn.add_many_Terminals(terminals[::-1])
+    for t in terminals[:100]:
+        cn.add_Terminals(t)
+        t.ConnectivityNode = cn
+    assert cn.Terminals == terminals
+    assert all(t.ConnectivityNode is cn for t in terminals)
+    assert isinstance(cn.Terminals, list) and terminals[-1] in cn.Terminals
+
+    # The inverse role is propagated once per new item
+    calls = []
+    fset = Terminal.ConnectivityNode.fset
+    def counting_fset(self, value):
+        calls.append(self)
+        fset(self, value)
+    other = ConnectivityNode(mRID='Other')
+    with patch.object(Terminal, 'ConnectivityNode', property(Terminal.ConnectivityNode.fget, counting_fset)):
+        other.Terminals = terminals[:10]
+    assert calls == terminals[:10]
+
+    # List methods keep the membership index up to date
+    values = cn.Terminals
+    values.remove(terminals[0])
+    assert terminals[0] not in values
+    del values[:10]
+    assert terminals[5] not in values and terminals[11] in values
+    values.append(terminals[11])
+    values.append(terminals[0])
+    assert values[-1] is terminals[0] and len(values) == 50000 - 10
+
+    # Short lists are scanned instead of holding a set, so they take little more memory than a plain list
+    def traced(build):
+        tracemalloc.start()
+        built = [build(i) for i in range(10000)]
+        size = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        return size
+    assert traced(lambda i: _UniqueList((i, -i))) < 1.5 * traced(lambda i: [i, -i])
+    short = _UniqueList(range(5))
+    short.add(3)
+    short += range(12)
+    assert short == list(range(12)) and 11 in short
+    del short[3:]
+    short.insert(0, 2)
+    assert short == [0, 1, 2] and 2 in short and 11 not in short
+
+    # Replacing items or repeating the list does not duplicate values either
+    for size in (5, 12):
+        short = _UniqueList(range(size))
+        short[0] = 3
+        short[1] = 1
+        short[2] = -2
+        short[3:5] = [0, 3, -9, -9, -6]
+        assert short == [0, 1, -2, 3, -9, -6] + list(range(5, size))
+        short *= 2
+        assert len(short) == size + 1 and -9 in short
+        short.remove(-9)
+        assert -9 not in short and short.count(3) == 1
+        with pytest.raises(ValueError):
+            short[::2] = [0, 0, 0]
+    short *= 0
+    assert short == [] and 0 not in short
+
+    restored = pickle.loads(pickle.dumps(ConnectivityNode(Terminals=[Terminal(sequenceNumber=7)])))
+    assert restored.Terminals[0].sequenceNumber == 7 and restored.Terminals[0] in restored.Terminals
+    restored.add_Terminals(restored.Terminals[0])
+    assert len(restored.Terminals) == 1
+
+
+def test_serialize_validation():
+    from tests.output import Switch, Terminal, ConnectivityNode, IdentifiedObject, DocumentCIMRDF
+
+    resources = []
+    for i in range(10):
+        s = Switch(mRID=f'SW{i}', normalOpen=True)
+        resources += [s, Terminal(sequenceNumber=1, ConductingEquipment=s, ConnectivityNode=ConnectivityNode())]
+    document = DocumentCIMRDF(resources)
+
+    # The whole class hierarchy is checked once per resource and export
+    switches = resources[::2]
+    calls = []
+    validate = IdentifiedObject.validate
+    def counting_validate(self):
+        calls.append(self)
+        validate(self)
+    with patch.object(IdentifiedObject, 'validate', counting_validate):
+        expected = document.tostring()
+        assert calls == switches
+        assert document.tostring() == expected
+        assert calls == switches
+        switches[0].name = 'Changed'
+        document.tostring()
+        assert calls[len(switches):] == [switches[0]]
+        document.tostring(validate=False)
+        document.pack(validate=False)
+        assert len(calls) == len(switches) + 1
+
+    invalid = Switch()
+    invalid._Switch__normalOpen = 'yes'
+    with pytest.raises(ValueError):
+        DocumentCIMRDF([invalid]).tostring()
+    assert b'Switch.normalOpen>yes<' in DocumentCIMRDF([invalid]).tostring(validate=False)
+
+    # Changing a list in place calls for a new validation too, also in a copy
+    import pickle
+    cn = ConnectivityNode(mRID='CN', Terminals=[Terminal(sequenceNumber=1)])
+    for cn in (cn, pickle.loads(pickle.dumps(cn))):
+        document = DocumentCIMRDF([cn])
+        document.tostring()
+        cn.Terminals.append('junk')
+        with pytest.raises(ValueError):
+            document.tostring()
+        cn.Terminals.remove('junk')
+        document.tostring()
+        cn.Terminals[0] = 'junk'
+        with pytest.raises(ValueError):
+            document.tostring()
+
+
+def test_validate_all(slots_module):
+    from tests import output
+
+    for module in (output, slots_module):
+        resources = _network(module, 200, normalOpen=True)
+        document = module.DocumentCIMRDF(resources)
+        assert document.validate_all() == []
+        assert document.validate_all(processes=2) == []
+
+        resources[1]._IdentifiedObject__name = 42
+        resources[4]._ConnectivityNode__Terminals.append('T')
+        orphan = module.Terminal(sequenceNumber=2)
+        orphan._Terminal__ConductingEquipment = resources[4]
+        document.add_elements(orphan)
+
+        report = document.validate_all()
+        assert report == document.validate_all(processes=2)
+        # Without fork, workers receive the resources pickled with their links cut
+        assert report == module._check_shallow(module._dump_shallow(document.resources))
+        assert [(violation.URI, violation.resource, violation.property) for violation in report] == [
+            (resources[1].URI, 'ConnectivityNode', 'name'),
+            (resources[4].URI, 'ConnectivityNode', 'Terminals'),
+            (orphan.URI, 'Terminal', 'ConductingEquipment'),
+        ]
+        assert 'encountered str instead' in report[1].message
+        with pytest.raises(ValueError) as error:
+            orphan.validate()
+        assert str(error.value) == report[2].message
+        assert resources[0]._validated and not resources[1]._validated
+
+
+def test_xml_backends(tmp_path):
+    pytest.importorskip('lxml')
+    from xml.etree import ElementTree as ET
+    from tests import output
+    from tests.output import DocumentCIMRDF
+
+    resources = _network(output, 50, name='Swítch & <co>\n"quoted"', normalOpen=True, open=False)
+
+    assert DocumentCIMRDF().backend == 'stdlib'
+    with pytest.raises(ValueError):
+        DocumentCIMRDF(backend='minidom')
+
+    outputs = {}
+    for backend in ('stdlib', 'lxml'):
+        document = DocumentCIMRDF(resources, backend=backend)
+        outputs[backend] = document.tostring()
+        document.tofile(str(tmp_path / f'{backend}.xml'))
+        assert (tmp_path / f'{backend}.xml').read_bytes() == outputs[backend]
+        # Trees are always built with the standard library
+        packed = document.pack()
+        assert isinstance(packed, ET.ElementTree)
+        packed.write(str(tmp_path / f'{backend}_packed.xml'))
+        assert (tmp_path / f'{backend}_packed.xml').read_bytes() == outputs['stdlib']
+
+    # The backends only differ in the spelling of empty elements
+    assert outputs['lxml'].replace(b'/>', b' />') == outputs['stdlib']
+    assert ET.canonicalize(outputs['lxml']) == ET.canonicalize(outputs['stdlib'])
+
+    # Documents written by one backend are read back the same by the other
+    xml = outputs['stdlib'].replace(b'><ns1:Switch ', b'><!-- switch --><ns1:Switch ', 1)
+    for backend in ('stdlib', 'lxml'):
+        parsed = DocumentCIMRDF(backend=backend)
+        parsed.fromstring(xml)
+        assert parsed.tostring() == outputs[backend]
+        parsed.fromstring(xml.decode())
+        assert len(parsed.resources) == len(resources)
+
+
+def test_pretty_printing(tmp_path, capsys):
+    import tracemalloc
+    from xml.etree import ElementTree as ET
+    from tests import output
+    from tests.output import DocumentCIMRDF, _WRITE_BATCH
+
+    class NullStream():
+        def write(self, data):
+            pass
+
+    resources = _network(output, 1000, name='Swítch\n<co>', normalOpen=True, open=False)
+    document = DocumentCIMRDF(resources, backend='stdlib')
+
+    root = document.pack().getroot()
+    ET.indent(root, space='    ')
+    expected = ET.tostring(root) + b'\n'
+    assert document.tostring(pretty=True) == expected
+    document.tofile(str(tmp_path / 'pretty.xml'), pretty=True)
+    assert (tmp_path / 'pretty.xml').read_bytes() == expected
+
+    stream = io.BytesIO()
+    document.dump(stream)
+    assert stream.getvalue() == expected
+    DocumentCIMRDF(resources[:3], backend='stdlib').dump()
+    assert capsys.readouterr().out.encode() == DocumentCIMRDF(resources[:3], backend='stdlib').tostring(pretty=True)
+    assert DocumentCIMRDF(backend='stdlib').tostring(pretty=True) == DocumentCIMRDF(backend='stdlib').tostring() + b'\n'
+
+    parsed = DocumentCIMRDF(backend='stdlib')
+    parsed.fromstring(expected)
+    assert parsed.get(resources[0].URI).name == 'Swítch\n<co>'
+    assert parsed.tostring() == document.tostring()
+
+    # Memory does not grow with the document, unlike a pretty-printed DOM
+    def peak_memory(dump):
+        tracemalloc.start()
+        try:
+            dump()
+            return tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    document.validate_all()
+    streamed = peak_memory(lambda: document.dump(NullStream()))
+    packed = peak_memory(lambda: document.pack())
+    # Only one batch of resources is serialized at once
+    small = DocumentCIMRDF(resources[:3 * _WRITE_BATCH], backend='stdlib')
+    few_batches = peak_memory(lambda: small.dump(NullStream()))
+    assert streamed < 1.2 * few_batches
+    assert streamed < 0.2 * packed
+
+    try:
+        import lxml
+    except ImportError:
+        return
+    lxml_output = DocumentCIMRDF(resources, backend='lxml').tostring(pretty=True)
+    assert lxml_output.replace(b'/>', b' />') == expected
+
+
+def test_load_many(tmp_path):
+    from tests.output import Switch, Terminal, ConnectivityNode, DocumentCIMRDF
+
+    switches, nodes, terminals = [], [], []
+    for i in range(300):
+        switches.append(Switch(mRID=f'SW{i}', normalOpen=True))
+        switches[-1].URI = f'#_SW{i}'
+        nodes.append(ConnectivityNode(mRID=f'CN{i}'))
+        nodes[-1].URI = f'#_CN{i}'
+    DocumentCIMRDF(switches, backend='stdlib').tofile(str(tmp_path / 'EQ.xml'))
+    DocumentCIMRDF(nodes, backend='stdlib').tofile(str(tmp_path / 'CN.xml'))
+
+    def profile(name, body):
+        (tmp_path / name).write_text(f'''<?xml version="1.0" encoding="utf-8"?>
+            <rdf:RDF xmlns:rdf="http://www.w3.org/1999/02/22-rdf-syntax-ns#" xmlns:cim="grei.ufc.br/DistributionNetwork#">
+            {body}
+            </rdf:RDF>''')
+        return str(tmp_path / name)
+
+    # Terminals referencing switches and nodes of other files, and extensions of the switches
+    paths = [
+        profile('TP.xml', ''.join(f'''
+            <cim:Terminal rdf:ID="_T{i}">
+                <cim:Terminal.ConductingEquipment rdf:resource="#_SW{i}"/>
+                <cim:Terminal.ConnectivityNode rdf:resource="#_CN{i}"/>
+                <cim:Terminal.sequenceNumber>1</cim:Terminal.sequenceNumber>
+            </cim:Terminal>''' for i in range(300))),
+        str(tmp_path / 'EQ.xml'),
+        profile('SSH.xml', ''.join(f'''
+            <cim:Switch rdf:about="#_SW{i}">
+                <cim:Switch.open>true</cim:Switch.open>
+            </cim:Switch>''' for i in range(0, 300, 2))),
+        str(tmp_path / 'CN.xml'),
+    ]
+
+    for processes in (1, 2):
+        document = DocumentCIMRDF()
+        document.load_many(paths, processes=processes)
+        assert len(document.resources) == 900
+        assert [resource.URI for resource in document.resources][:2] == ['#_T0', '#_T1']
+        switch = document.get('#_SW4')
+        assert switch.mRID == 'SW4' and switch.normalOpen is True and switch.open is True
+        assert document.get('#_SW5').open is None
+        assert switch.Terminals == [document.get('#_T4')]
+        assert document.get('#_CN4').Terminals[0].ConductingEquipment is switch
+        assert document.validate_all() == []
+
+    with pytest.raises(KeyError):
+        DocumentCIMRDF().load_many(paths[:1], processes=2)
+
+
+def test_snapshot(tmp_path, monkeypatch, slots_module):
+    from decimal import Decimal
+    from tests import output
+
+    for module in (output, slots_module):
+        voltage = module.Voltage(multiplier=module.UnitMultiplier.k, unit=module.UnitSymbol.V, value=Decimal('13.8'))
+        resources = [voltage, module.BaseVoltage(nominalVoltage=voltage)]
+        resources += _network(module, 100, name='Switch é', normalOpen=False)
+        document = module.DocumentCIMRDF(resources)
+        document.save_snapshot(str(tmp_path / 'model.snap'))
+
+        loaded = module.DocumentCIMRDF()
+        loaded.load_snapshot(str(tmp_path / 'model.snap'))
+        assert [resource.URI for resource in loaded.resources] == [resource.URI for resource in resources]
+        assert loaded.tostring() == document.tostring()
+        switch = loaded.get(resources[5].URI)
+        assert switch.normalOpen is False and switch.open is None and switch.name == 'Switch é'
+        assert switch.Terminals == [loaded.get(resources[7].URI)]
+        assert switch.Terminals[0].ConductingEquipment is switch and switch.Terminals[0].sequenceNumber == 1
+        assert loaded.resources[1].nominalVoltage is loaded.resources[0]
+        assert loaded.resources[0].multiplier is module.UnitMultiplier.k
+        assert loaded.resources[0].value == Decimal('13.8')
+
+        # The snapshot stays usable as a regular document
+        switch.add_Terminals(module.Terminal(sequenceNumber=2))
+        assert len(switch.Terminals) == 2
+
+    # Snapshots of another schema or generator version are rejected
+    monkeypatch.setattr(output, '_SCHEMA_HASH', generator.schema_digest('other', {}, {}))
+    with pytest.raises(ValueError):
+        output.DocumentCIMRDF().load_snapshot(str(tmp_path / 'model.snap'))
+    with pytest.raises(ValueError):
+        output.DocumentCIMRDF([output.Terminal(ConductingEquipment=output.Switch())]).save_snapshot(
+            str(tmp_path / 'dangling.snap'))
+
+
+def test_difference_model():
+    from tests import output
+    from tests.output import Switch, Terminal, ConnectivityNode, DocumentCIMRDF
+
+    def network():
+        return DocumentCIMRDF(_network(output, 5, uris=True, normalOpen=True, open=False), backend='stdlib')
+
+    old, new = network(), network()
+    new.get('#_SW1').open = True
+    terminal = new.get('#_T2')
+    new.get('#_CN2').Terminals.remove(terminal)
+    terminal.ConnectivityNode = new.get('#_CN3')
+    terminal = new.get('#_T4')
+    new.get('#_SW4').Terminals.remove(terminal)
+    new.get('#_CN4').Terminals.remove(terminal)
+    new.resources.discard(terminal)
+    new.add_elements(ConnectivityNode(mRID='CN5', URI='#_CN5'))
+
+    difference = old.difference(new, pretty=True)
+    assert difference.count(b'<ns2:Switch ') == 3
+    old.apply_difference(io.BytesIO(difference))
+    assert old.tostring() == new.tostring()
+    assert '#_T4' not in old and old.get('#_CN5').mRID == 'CN5'
+    assert old.get('#_CN2').Terminals == [] and old.get('#_CN3').Terminals == [old.get('#_T3'), old.get('#_T2')]
+    assert b'<ns1:forwardDifferences rdf:parseType="Statements" />' in old.difference(new)
+
+    # A difference model that does not match the document (here, already applied) is rejected,
+    # leaving the document unchanged
+    with pytest.raises(ValueError):
+        old.apply_difference(io.BytesIO(difference))
+    assert old.tostring() == new.tostring()
+
+    document = network()
+
+    # Difference models from other tools may only describe one side of a changed reference, and describe
+    # existing resources without their rdf:type
+    def difference_model(reverse, forward):
+        return io.StringIO(f'''<?xml version="1.0" encoding="utf-8"?>
+        <rdf:RDF xmlns:rdf="http://www.w3.org/1999/02/22-rdf-syntax-ns#" xmlns:cim="grei.ufc.br/DistributionNetwork#"
+                 xmlns:dm="http://iec.ch/2002/schema/CIM_difference_model#">
+            <dm:DifferenceModel rdf:about="#_DM">
+                <dm:reverseDifferences rdf:parseType="Statements">{reverse}</dm:reverseDifferences>
+                <dm:forwardDifferences rdf:parseType="Statements">{forward}</dm:forwardDifferences>
+            </dm:DifferenceModel>
+        </rdf:RDF>''')
+
+    document.apply_difference(difference_model('''
+                    <cim:Switch rdf:about="#_SW0">
+                        <cim:Switch.open>false</cim:Switch.open>
+                    </cim:Switch>''', '''
+                    <rdf:Description rdf:about="#_SW0">
+                        <cim:Switch.open>true</cim:Switch.open>
+                    </rdf:Description>
+                    <rdf:Description rdf:about="#_T1">
+                        <cim:Terminal.ConnectivityNode rdf:resource="#_CN0"/>
+                    </rdf:Description>'''))
+    assert document.get('#_SW0').open is True
+    assert document.get('#_CN1').Terminals == [] and document.get('#_T1') in document.get('#_CN0').Terminals
+
+    # New resources need an rdf:type
+    with pytest.raises(ValueError):
+        document.apply_difference(difference_model('', '''
+                    <rdf:Description rdf:about="#_CN9">
+                        <cim:IdentifiedObject.mRID>CN9</cim:IdentifiedObject.mRID>
+                    </rdf:Description>'''))
+    assert '#_CN9' not in document
+
+    # A resource whose class changes under the same URI is replaced, also as the target of references
+    from xml.etree import ElementTree as ET
+    from tests.output import BaseVoltage, Length, Voltage
+    old = DocumentCIMRDF([Switch(mRID='SW', URI='#_A'), Voltage(value='69', URI='#_V')], backend='stdlib')
+    old.add_elements([Terminal(sequenceNumber=1, ConductingEquipment=old.get('#_A'), URI='#_T'),
+                      BaseVoltage(nominalVoltage=old.get('#_V'), URI='#_BV')])
+    new = DocumentCIMRDF([ConnectivityNode(mRID='CN', URI='#_A'), Length(value='2', URI='#_V')], backend='stdlib')
+    new.add_elements([Terminal(sequenceNumber=1, ConnectivityNode=new.get('#_A'), URI='#_T'),
+                      BaseVoltage(nominalVoltage=new.get('#_V'), URI='#_BV')])
+    def descriptions(document):
+        # The new instance comes last in the document
+        return sorted(ET.tostring(element) for element in document.pack(validate=False).getroot())
+    old.apply_difference(io.BytesIO(old.difference(new)))
+    assert type(old.get('#_A')) is ConnectivityNode and old.get('#_BV').nominalVoltage is old.get('#_V')
+    assert descriptions(old) == descriptions(new)
+    assert old.referrers(old.get('#_V')) == [old.get('#_BV')]
+
+    # unless statements of the former resource would be left over
+    with pytest.raises(ValueError):
+        old.apply_difference(difference_model('', '''
+                    <cim:Switch rdf:about="#_A">
+                        <cim:IdentifiedObject.mRID>SW</cim:IdentifiedObject.mRID>
+                    </cim:Switch>'''))
+    assert descriptions(old) == descriptions(new)
+
+    # An invalid value is rejected as well, even after valid statements
+    document = DocumentCIMRDF([Voltage(value='69', URI='#_V')], backend='stdlib')
+    before = document.tostring()
+    for value, unit in (('70', 'bogus'), ('seventy', 'V')):
+        with pytest.raises(ValueError):
+            document.apply_difference(difference_model('''
+                    <cim:Voltage rdf:about="#_V">
+                        <cim:Voltage.value>69</cim:Voltage.value>
+                    </cim:Voltage>''', f'''
+                    <cim:Voltage rdf:about="#_V">
+                        <cim:Voltage.value>{value}</cim:Voltage.value>
+                        <cim:Voltage.unit>{unit}</cim:Voltage.unit>
+                    </cim:Voltage>'''))
+        assert document.tostring() == before
+
+
+def test_indexes():
+    from tests import output
+    from tests.output import (Switch, Terminal, ConductingEquipment, BaseVoltage, Voltage, IdentifiedObject,
+                              DocumentCIMRDF)
+
+    voltage = BaseVoltage(nominalVoltage=Voltage(value=13800))
+    resources = [voltage] + _network(output, 3)
+    document = DocumentCIMRDF(resources)
+
+    assert document.of_type(Switch) == resources[1::3]
+    assert document.of_type(ConductingEquipment) == resources[1::3]
+    assert len(document.of_type(IdentifiedObject)) == 6 and document.of_type(Voltage) == []
+    assert document.get_by_mrid('CN1') is resources[5] and document.get_by_mrid('T1') is None
+
+    # BaseVoltage.nominalVoltage has no inverse property
+    assert document.referrers(voltage.nominalVoltage) == [voltage]
+    assert document.referrers(resources[1]) == [resources[3]]
+    assert document.referrers(resources[3]) == resources[1:3]
+
+    # Indexes follow added and removed resources
+    s = Switch(mRID='SW3')
+    document.add_recursively(Terminal(sequenceNumber=1, ConductingEquipment=s))
+    assert document.of_type(ConductingEquipment)[-1] is s and document.get_by_mrid('SW3') is s
+    assert document.referrers(s) == [document.resources[-2]]
+    document.resources.discard(s)
+    assert s not in document.of_type(Switch) and document.get_by_mrid('SW3') is None
+    assert document.referrers(document.resources[-1]) == []
+
+    # and resources changed in place once reindexed
+    s = resources[1]
+    s.mRID = 'SW9'
+    resources[6].ConductingEquipment = s
+    assert document.get_by_mrid('SW0') is None
+    document.reindex(s, resources[6])
+    assert document.get_by_mrid('SW9') is s
+    assert document.referrers(s) == [resources[3], resources[6]]
+
+
+def test_columns():
+    np = pytest.importorskip('numpy')
+    from decimal import Decimal
+    from tests.output import Switch, Terminal, ConnectivityNode, Voltage, UnitMultiplier, DocumentCIMRDF
+
+    resources = []
+    for i in range(4):
+        s = Switch(mRID=f'SW{i}', normalOpen=i % 2 == 0)
+        cn = ConnectivityNode(mRID=f'CN{i}')
+        resources += [s, cn, Terminal(sequenceNumber=i, ConductingEquipment=s, ConnectivityNode=cn if i else None)]
+    resources += [Voltage(value=Decimal('13.8'), multiplier=UnitMultiplier.k), Voltage()]
+    document = DocumentCIMRDF(resources)
+
+    columns = document.to_columns(Terminal)
+    assert columns['index'].tolist() == [2, 5, 8, 11]
+    assert columns['ConductingEquipment'].tolist() == [0, 3, 6, 9]
+    assert columns['ConnectivityNode'].tolist() == [-1, 4, 7, 10]
+    assert columns['sequenceNumber'].dtype == np.int64
+    columns = document.to_columns(Switch, ['normalOpen', 'open', 'Terminals'])
+    assert set(columns) == {'index', 'normalOpen', 'open', 'Terminals'}
+    assert columns['normalOpen'].tolist() == [True, False, True, False] and np.isnan(columns['open']).all()
+    assert [terminals.tolist() for terminals in columns['Terminals']] == [[2], [5], [8], [11]]
+    columns = document.to_columns(Voltage)
+    assert columns['multiplier'].tolist() == [UnitMultiplier.k, None]
+    assert columns['value'][0] == 13.8 and np.isnan(columns['value'][1])
+    with pytest.raises(ValueError):
+        document.to_columns(Voltage, ['resistance'])
+
+    # Vectorized updates written back in bulk
+    columns = document.to_columns(Voltage, ['value'])
+    columns['value'] *= 2
+    document.from_columns(Voltage, columns)
+    assert resources[-2].value == Decimal('27.6') and resources[-1].value is None
+    document.from_columns(Terminal, {'ConnectivityNode': np.array([4, 4, -1, 10])})
+    assert [resource.ConnectivityNode for resource in resources[2:12:3]] == [resources[4], resources[4], None, resources[10]]
+    assert resources[4].Terminals == [resources[5], resources[2]] and resources[7].Terminals == []
+    assert document.referrers(resources[7]) == []
+    with pytest.raises(ValueError):
+        document.from_columns(Terminal, {'sequenceNumber': [1, 2]})
+
+
+def test_instrumentation(tmp_path):
+    from tests import output
+    from tests.output import DocumentCIMRDF, Instrumentation
+
+    class Metrics(Instrumentation):
+        def __init__(self):
+            super().__init__()
+            self.events = []
+
+        def add_time(self, phase, seconds):
+            super().add_time(phase, seconds)
+            self.events.append(phase)
+
+    resources = _network(output, 10, normalOpen=True)
+    metrics = Metrics()
+    document = DocumentCIMRDF(resources, backend='stdlib', instrumentation=metrics)
+
+    xml = document.tostring()
+    assert set(metrics.timings) == {'validate', 'serialize', 'write'} and sorted(metrics.events) == sorted(metrics.timings)
+    assert metrics.resources['written'] == {'Switch': 10, 'ConnectivityNode': 10, 'Terminal': 10}
+    assert metrics.bytes == {'read': 0, 'written': len(xml)}
+    # Disabled instrumentation gives the same output
+    assert DocumentCIMRDF(resources, backend='stdlib').tostring() == xml
+
+    metrics.reset()
+    document.pack()
+    document.tofile(str(tmp_path / 'model.xml'))
+    assert metrics.resources['written']['Terminal'] == 20 and metrics.bytes['written'] == len(xml)
+
+    metrics.reset()
+    loaded = DocumentCIMRDF(backend='stdlib', instrumentation=metrics)
+    loaded.fromfile(str(tmp_path / 'model.xml'))
+    loaded.fromstring(xml)
+    assert set(metrics.timings) == {'parse', 'create', 'set', 'resolve'}
+    assert all(seconds >= 0 for seconds in metrics.timings.values())
+    assert metrics.resources['read'] == {'Switch': 20, 'ConnectivityNode': 20, 'Terminal': 20}
+    assert metrics.bytes == {'read': 2 * len(xml), 'written': 0}
+    assert loaded.tostring() == xml
+
+    loaded.validate_all()
+    assert 'validate' in metrics.timings
+
 if __name__ == "__main__":
     test_output_generation()
     test_raises_validation_error()
@@ -221,4 +1164,4 @@ if __name__ == "__main__":
     test_new_version_debug()
     test_recursive_add()
     test_write_to_file()
-    test_read_from_file()
\ No newline at end of file
+    test_read_from_file()
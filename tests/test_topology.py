@@ -0,0 +1,79 @@
+import importlib.util
+import os
+import random
+import sys
+
+import pytest
+
+sys.path.insert(0, os.getcwd())
+from cimrdfpy import generator
+from cimrdfpy.topology import TopologyProcessor
+
+
+@pytest.fixture(scope='module')
+def cim(tmp_path_factory):
+    filename = str(tmp_path_factory.mktemp('topology') / 'topology_output.py')
+    generator.main(['./tests/test_rdfs.xml', filename])
+    spec = importlib.util.spec_from_file_location('topology_output', filename)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def connect(cim, equipment, *nodes):
+    return [cim.Terminal(sequenceNumber=i + 1, ConductingEquipment=equipment, ConnectivityNode=node) for i, node in enumerate(nodes)]
+
+
+def partition(groups):
+    return sorted(sorted(node.mRID for node in group) for group in groups)
+
+
+def test_buses_and_islands(cim):
+    nodes = [cim.ConnectivityNode(mRID=f'CN{i}') for i in range(6)]
+    closed = cim.Switch(normalOpen=False)
+    opened = cim.Switch(normalOpen=False, open=True)
+    line = cim.ACLineSegment()
+    transformer = cim.PowerTransformer()
+    resources = nodes + [closed, opened, line, transformer]
+    resources += connect(cim, closed, nodes[0], nodes[1])
+    resources += connect(cim, opened, nodes[1], nodes[2])
+    resources += connect(cim, line, nodes[2], nodes[3])
+    resources += connect(cim, transformer, nodes[3], nodes[4])
+
+    topology = TopologyProcessor(resources)
+    assert partition(topology.buses()) == [['CN0', 'CN1'], ['CN2'], ['CN3'], ['CN4'], ['CN5']]
+    assert partition(topology.islands()) == [['CN0', 'CN1'], ['CN2', 'CN3', 'CN4'], ['CN5']]
+    assert partition([topology.bus(nodes[1])]) == [['CN0', 'CN1']]
+
+    # With normal states, `open` is ignored
+    assert partition(TopologyProcessor(resources, normal=True).islands()) == [['CN0', 'CN1', 'CN2', 'CN3', 'CN4'], ['CN5']]
+
+    topology.set_switch(opened, False)
+    assert opened.open is False
+    assert partition(topology.buses()) == [['CN0', 'CN1', 'CN2'], ['CN3'], ['CN4'], ['CN5']]
+    assert partition([topology.island(nodes[0])]) == [['CN0', 'CN1', 'CN2', 'CN3', 'CN4']]
+
+    closed.open = True
+    topology.update(closed)
+    assert partition(topology.buses()) == [['CN0'], ['CN1', 'CN2'], ['CN3'], ['CN4'], ['CN5']]
+    assert partition(topology.islands()) == [['CN0'], ['CN1', 'CN2', 'CN3', 'CN4'], ['CN5']]
+
+
+def test_incremental_updates(cim):
+    # A meshed network: a ring of switches with lines across it
+    random.seed(0)
+    nodes = [cim.ConnectivityNode(mRID=f'CN{i}') for i in range(60)]
+    switches = [cim.Switch(normalOpen=random.random() < 0.3) for _ in nodes]
+    lines = [cim.ACLineSegment() for _ in range(10)]
+    resources = nodes + switches + lines
+    for i, switch in enumerate(switches):
+        resources += connect(cim, switch, nodes[i], nodes[(i + 1) % len(nodes)])
+    for line in lines:
+        resources += connect(cim, line, *random.sample(nodes, 2))
+
+    topology = TopologyProcessor(resources)
+    for _ in range(200):
+        topology.set_switch(random.choice(switches), random.random() < 0.5)
+        rebuilt = TopologyProcessor(resources)
+        assert partition(topology.buses()) == partition(rebuilt.buses())
+        assert partition(topology.islands()) == partition(rebuilt.islands())